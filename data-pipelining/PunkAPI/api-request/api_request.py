@@ -1,27 +1,90 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import HttpClient
 
 BASE_URL = "https://punkapi.online/v3/beers"
 
-def fetch_all_beers(per_page=80):
+def fetch_page(session, page, per_page=80, base_url=BASE_URL, cache=None):
     """
-    Fetch details of all beers from Punk API (paginated).
+    Fetch a single page of beers. Pages past the end come back empty.
+    With an HttpCache, unchanged pages are served from disk.
     """
-    all_beers = []
-    page = 1
-    while True:
-        try:
-            api_url = f"{BASE_URL}?page={page}&per_page={per_page}"
-            response = requests.get(api_url)
-            response.raise_for_status()
-            beers = response.json()
+    api_url = f"{base_url}?page={page}&per_page={per_page}"
+    if cache is not None:
+        return cache.get_json(session, api_url)
+    response = session.get(api_url)
+    response.raise_for_status()
+    return response.json()
+
+def iter_beer_pages(per_page=80, max_workers=None, base_url=BASE_URL, cache=None, client=None):
+    """
+    Yield beers from Punk API one page at a time, in page order.
+    Pass max_workers to fetch pages concurrently instead of one at a time.
+
+    Transient failures are retried by the HttpClient; a page that still fails
+    raises instead of ending pagination early, so callers never mistake a
+    partial catalogue for the whole one. Pass a client to share its
+    connections, rate limit and metrics with the caller.
+    """
+    owned = client is None
+    if owned:
+        client = HttpClient(pool_size=max_workers or 1)
+    try:
+        if max_workers:
+            yield from _iter_pages_concurrent(per_page, max_workers, base_url, cache, client)
+            return
+
+        page = 1
+        while True:
+            try:
+                beers = fetch_page(client, page, per_page, base_url, cache)
+            except requests.exceptions.RequestException as e:
+                print(f"An Error Occurred on page {page}! {e}")
+                raise
             if not beers:  # no more beers
                 break
-            all_beers.extend(beers)
             print(f"✅ Retrieved page {page}, {len(beers)} beers")
+            yield beers
             page += 1
-        except requests.exceptions.RequestException as e:
-            print(f"An Error Occurred! {e}")
-            break
+    finally:
+        if owned:
+            client.close()
+
+def _iter_pages_concurrent(per_page, max_workers, base_url, cache, client):
+    """
+    Fetch pages with up to max_workers requests in flight over one pooled client.
+
+    The API does not report a page count, so pages are probed in windows of
+    max_workers. The first empty page marks the end, exactly where the serial
+    loop stops, and pages are yielded in page order.
+    """
+    page = 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            window = range(page, page + max_workers)
+            futures = [executor.submit(fetch_page, client, p, per_page, base_url, cache) for p in window]
+            for p, future in zip(window, futures):
+                try:
+                    beers = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"An Error Occurred on page {p}! {e}")
+                    raise
+                if not beers:  # no more beers
+                    return
+                print(f"✅ Retrieved page {p}, {len(beers)} beers")
+                yield beers
+            page += max_workers
+
+def fetch_all_beers(per_page=80, max_workers=None, base_url=BASE_URL, cache=None, client=None):
+    """
+    Fetch details of all beers from Punk API (paginated).
+    Pass max_workers to fetch pages concurrently instead of one at a time.
+    Raises if any page cannot be fetched.
+    """
+    all_beers = []
+    for beers in iter_beer_pages(per_page, max_workers, base_url, cache, client):
+        all_beers.extend(beers)
     return all_beers
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+On-disk HTTP cache for PunkAPI pages.
+
+Page bodies are stored with their ETag/Last-Modified validators and revalidated
+with conditional requests, so an unchanged page costs a 304 instead of a full
+download. Entries younger than max_age seconds are served without any request.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.getenv("PUNKAPI_CACHE_DIR", os.path.expanduser("~/.cache/punkapi"))
+CACHE_MAX_AGE = int(os.getenv("PUNKAPI_CACHE_MAX_AGE", "0"))  # 0 = always revalidate
+
+class HttpCache:
+    """
+    JSON response cache keyed by URL, one file per URL under cache_dir.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_age=CACHE_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.stats = {"fresh": 0, "revalidated": 0, "miss": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def hits(self):
+        return self.stats["fresh"] + self.stats["revalidated"]
+
+    @property
+    def misses(self):
+        return self.stats["miss"]
+
+    def summary(self):
+        return (f"{self.hits} hits ({self.stats['fresh']} fresh, "
+                f"{self.stats['revalidated']} revalidated), {self.misses} misses")
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def _load(self, url):
+        try:
+            with open(self._path(url)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def _store(self, url, entry):
+        path = self._path(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def get_json(self, session, url):
+        """
+        GET url through session and return the decoded JSON body, using the cache.
+        """
+        entry = self._load(url)
+        if entry and self.max_age and time.time() - entry["stored_at"] < self.max_age:
+            self._count("fresh")
+            return entry["body"]
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, headers=headers)
+        if entry and response.status_code == 304:
+            self._count("revalidated")
+            entry["stored_at"] = time.time()
+            self._store(url, entry)
+            return entry["body"]
+
+        response.raise_for_status()
+        body = response.json()
+        self._count("miss")
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified or self.max_age:
+            self._store(url, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": time.time(),
+                "body": body,
+            })
+        return body
@@ -1,17 +1,24 @@
+import io
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
-from api_request import fetch_all_beers
+from api_request import BASE_URL, iter_beer_pages
+from db_pool import checkin, checkout, connection
+from http_cache import HttpCache
+from http_client import HttpClient
+from metrics import RunMetrics
+from normalise import beer_hashes, filter_rows, is_arrow, rows_by_table, table_columns
+
+FETCH_WORKERS = 8  # concurrent page requests against PunkAPI
+PAGE_QUEUE_SIZE = 4  # fetched pages allowed to wait for the database before fetching pauses
 
 def connect_db():
     print("Connecting to db ...")
     try:
-        conn = psycopg2.connect(
-            host="db",
-            port=5432,
-            dbname="db",
-            user="db_user",
-            password="db_password"
-        )
-        return conn
+        return checkout()
     except psycopg2.Error as e:
         print(f"connection failed: {e}")
         raise
@@ -36,8 +43,10 @@ def create_tables(conn):
                 ph FLOAT,
                 brewers_tips TEXT,
                 contributed_by TEXT,
-                inserted_at TIMESTAMP DEFAULT NOW()
+                inserted_at TIMESTAMP DEFAULT NOW(),
+                content_hash TEXT
             );        
+            ALTER TABLE dev.raw_beer_data ADD COLUMN IF NOT EXISTS content_hash TEXT;
 
             CREATE TABLE IF NOT EXISTS dev.malt_ingredients (
                 id SERIAL PRIMARY KEY,
@@ -68,126 +77,436 @@ def create_tables(conn):
                 beer_id INT REFERENCES dev.raw_beer_data(beer_id),
                 pairing TEXT
             );
+
+            CREATE INDEX IF NOT EXISTS malt_ingredients_beer_id_idx ON dev.malt_ingredients (beer_id);
+            CREATE INDEX IF NOT EXISTS hop_ingredients_beer_id_idx ON dev.hop_ingredients (beer_id);
+            CREATE INDEX IF NOT EXISTS yeast_ingredients_beer_id_idx ON dev.yeast_ingredients (beer_id);
+            CREATE INDEX IF NOT EXISTS food_pairings_beer_id_idx ON dev.food_pairings (beer_id);
+
+            CREATE TABLE IF NOT EXISTS dev.dim_hop (
+                hop_key SERIAL PRIMARY KEY,
+                hop_name TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS dev.dim_malt (
+                malt_key SERIAL PRIMARY KEY,
+                malt_name TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS dev.beer_hop (
+                beer_id INT NOT NULL REFERENCES dev.raw_beer_data(beer_id),
+                hop_key INT NOT NULL REFERENCES dev.dim_hop(hop_key),
+                PRIMARY KEY (beer_id, hop_key)
+            );
+
+            CREATE TABLE IF NOT EXISTS dev.beer_malt (
+                beer_id INT NOT NULL REFERENCES dev.raw_beer_data(beer_id),
+                malt_key INT NOT NULL REFERENCES dev.dim_malt(malt_key),
+                PRIMARY KEY (beer_id, malt_key)
+            );
+
+            -- covering indexes: per-ingredient counts are index-only scans
+            CREATE INDEX IF NOT EXISTS beer_hop_hop_key_idx ON dev.beer_hop (hop_key) INCLUDE (beer_id);
+            CREATE INDEX IF NOT EXISTS beer_malt_malt_key_idx ON dev.beer_malt (malt_key) INCLUDE (beer_id);
+        """)
+        # one-off backfill for databases loaded before the dimensions existed
+        cursor.execute("""
+            SELECT EXISTS (SELECT 1 FROM dev.raw_beer_data)
+               AND NOT EXISTS (SELECT 1 FROM dev.beer_hop)
+               AND NOT EXISTS (SELECT 1 FROM dev.beer_malt);
         """)
+        if cursor.fetchone()[0]:
+            print("Backfilling ingredient dimensions ...")
+            refresh_ingredient_dims(cursor)
         conn.commit()
         print("Tables created...")
     except psycopg2.Error as e:
         print(f"Failed to create tables: {e}")
         raise
 
-def insert_records(conn, beers):
+# (ingredient table, name column, dimension table, surrogate key, beer bridge table)
+INGREDIENT_DIMS = [
+    ("hop_ingredients", "hop_name", "dim_hop", "hop_key", "beer_hop"),
+    ("malt_ingredients", "malt_name", "dim_malt", "malt_key", "beer_malt"),
+]
+
+def refresh_ingredient_dims(cursor, beer_ids=None):
+    """
+    Add new hop/malt names to dim_hop/dim_malt and rebuild the beer_hop/beer_malt
+    bridge rows of the given beers (all beers when beer_ids is None) from the
+    ingredient tables. Existing names keep their keys.
+    """
+    where = "TRUE" if beer_ids is None else "i.beer_id = ANY(%(beer_ids)s)"
+    for source, name, dim, key, bridge in INGREDIENT_DIMS:
+        cursor.execute(f"""
+            INSERT INTO dev.{dim} ({name})
+            SELECT DISTINCT i.{name} FROM dev.{source} i
+            WHERE {where} AND i.{name} IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM dev.{dim} d WHERE d.{name} = i.{name})
+            ON CONFLICT ({name}) DO NOTHING;
+
+            DELETE FROM dev.{bridge} i WHERE {where};
+
+            INSERT INTO dev.{bridge} (beer_id, {key})
+            SELECT DISTINCT i.beer_id, d.{key}
+            FROM dev.{source} i JOIN dev.{dim} d ON d.{name} = i.{name}
+            WHERE {where};
+        """, {"beer_ids": beer_ids})
+
+def insert_records(conn, rows):
     print("Inserting beer records ...")
     try:
         cursor = conn.cursor()
-        for beer in beers:
-            cursor.execute("""
-                INSERT INTO dev.raw_beer_data(
-                    beer_id, name, tagline, first_brewed, description,
-                    image, abv, ibu, ebc, ph, brewers_tips, contributed_by, inserted_at
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-                ON CONFLICT (beer_id) DO NOTHING;
-            """, (
-                beer["id"],
-                beer["name"],
-                beer["tagline"],
-                beer["first_brewed"],
-                beer["description"],
-                beer.get("image"), 
-                beer.get("abv"),
-                beer.get("ibu"),
-                beer.get("ebc"),
-                beer.get("ph"),
-                beer.get("brewers_tips"),
-                beer.get("contributed_by"),
-            ))
+        beers = rows["raw_beer_data"]
+        cursor.executemany("""
+            INSERT INTO dev.raw_beer_data(
+                beer_id, name, tagline, first_brewed, description,
+                image, abv, ibu, ebc, ph, brewers_tips, contributed_by, content_hash, inserted_at
+            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+            ON CONFLICT (beer_id) DO NOTHING;
+        """, beers)
         conn.commit()
         print(f"✅ Inserted {len(beers)} beers into DB")
     except psycopg2.Error as e: 
         print(f"Error inserting values: {e}")
         raise
 
-def insert_malt_ingredients(conn, beers):
+def insert_malt_ingredients(conn, rows):
     cursor = conn.cursor()
-    for beer in beers:
-        beer_id = beer["id"]
-        malts = beer.get("ingredients", {}).get("malt", [])
-        for malt in malts:
-            cursor.execute("""
-                INSERT INTO dev.malt_ingredients (beer_id, malt_name, amount_value, amount_unit)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                beer_id,
-                malt.get("name"),
-                malt.get("amount", {}).get("value"),
-                malt.get("amount", {}).get("unit")
-            ))
+    cursor.executemany("""
+        INSERT INTO dev.malt_ingredients (beer_id, malt_name, amount_value, amount_unit)
+        VALUES (%s, %s, %s, %s)
+    """, rows["malt_ingredients"])
     conn.commit()
     print("Inserted malt ingredients.")
 
-def insert_hop_ingredients(conn, beers):
+def insert_hop_ingredients(conn, rows):
     cursor = conn.cursor()
-    for beer in beers:
-        beer_id = beer["id"]
-        hops = beer.get("ingredients", {}).get("hops", [])
-        for hop in hops:
-            cursor.execute("""
-                INSERT INTO dev.hop_ingredients (beer_id, hop_name, amount_value, amount_unit, add_stage, attribute)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                beer_id,
-                hop.get("name"),
-                hop.get("amount", {}).get("value"),
-                hop.get("amount", {}).get("unit"),
-                hop.get("add"),
-                hop.get("attribute")
-            ))
+    cursor.executemany("""
+        INSERT INTO dev.hop_ingredients (beer_id, hop_name, amount_value, amount_unit, add_stage, attribute)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, rows["hop_ingredients"])
     conn.commit()
     print("Inserted hop ingredients.")
 
-def insert_yeast_ingredients(conn, beers):
+def insert_yeast_ingredients(conn, rows):
     cursor = conn.cursor()
-    for beer in beers:
-        beer_id = beer["id"]
-        yeast = beer.get("ingredients", {}).get("yeast")
-        if yeast:
-            cursor.execute("""
-                INSERT INTO dev.yeast_ingredients (beer_id, yeast_name)
-                VALUES (%s, %s)
-            """, (beer_id, yeast))
+    cursor.executemany("""
+        INSERT INTO dev.yeast_ingredients (beer_id, yeast_name)
+        VALUES (%s, %s)
+    """, rows["yeast_ingredients"])
     conn.commit()
     print("Inserted yeast ingredients.")
 
-def insert_food_pairings(conn, beers):
+def insert_food_pairings(conn, rows):
     cursor = conn.cursor()
-    for beer in beers:
-        beer_id = beer["id"]
-        pairings = beer.get("food_pairing", [])
-        for pairing in pairings:
-            cursor.execute("""
-                INSERT INTO dev.food_pairings (beer_id, pairing)
-                VALUES (%s, %s)
-            """, (beer_id, pairing))
+    cursor.executemany("""
+        INSERT INTO dev.food_pairings (beer_id, pairing)
+        VALUES (%s, %s)
+    """, rows["food_pairings"])
     conn.commit()
     print("Inserted food pairings.")
 
-def main():
-    try: 
-        beers = fetch_all_beers()
-        print(f"Fetched {len(beers)} beers from API")
-        
-        conn = connect_db()
-        create_tables(conn)
-        insert_records(conn, beers)
-        insert_malt_ingredients(conn, beers)
-        insert_hop_ingredients(conn, beers)
-        insert_yeast_ingredients(conn, beers)
-        insert_food_pairings(conn, beers)
+def _copy_text(value):
+    """
+    Render one value in COPY text format (NULL as \\N, special characters escaped).
+    """
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Stream rows into table with a single COPY FROM STDIN round trip.
+    rows may be a list of tuples or a pyarrow Table. Returns the size of the
+    COPY payload.
+    """
+    if is_arrow(rows):
+        return _copy_arrow(cursor, table, columns, rows)
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_text(value) for value in row))
+        buffer.write("\n")
+    size = buffer.tell()
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return size
+
+def _copy_arrow(cursor, table, columns, arrow_table):
+    """
+    COPY a pyarrow Table as CSV written straight from its column buffers,
+    without building Python row objects.
+    """
+    from pyarrow import csv
+    buffer = io.BytesIO()
+    options = csv.WriteOptions(include_header=False, quoting_style="all_valid")  # NULLs stay unquoted
+    csv.write_csv(arrow_table.select(columns), buffer, options)
+    size = buffer.tell()
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return size
+
+CHILD_TABLES = ["malt_ingredients", "hop_ingredients", "yeast_ingredients", "food_pairings"]
+
+def _stored_hashes(cursor, hashes):
+    cursor.execute(
+        "SELECT beer_id, content_hash FROM dev.raw_beer_data WHERE beer_id = ANY(%s);",
+        ([beer_id for beer_id, _ in hashes],),
+    )
+    return dict(cursor.fetchall())
+
+def changed_beer_ids(cursor, beer_rows):
+    """
+    Return the ids of beers that are new or whose content hash differs from the stored one.
+    """
+    hashes = beer_hashes(beer_rows)
+    stored = _stored_hashes(cursor, hashes)
+    return {beer_id for beer_id, content_hash in hashes if stored.get(beer_id) != content_hash}
+
+def new_beer_ids(cursor, beer_rows):
+    """
+    Return the ids of beers not in dev.raw_beer_data yet.
+    """
+    hashes = beer_hashes(beer_rows)
+    stored = _stored_hashes(cursor, hashes)
+    return {beer_id for beer_id, _ in hashes if beer_id not in stored}
+
+def _stage_child_table(table, table_rows, metrics=None):
+    """
+    COPY one child table's rows into a fresh unlogged staging table on its own
+    pooled connection; returns the staging table's name and the seconds taken.
+    """
+    start = time.perf_counter()
+    stage = f"dev.stage_{table}_{uuid.uuid4().hex[:12]}"
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            CREATE UNLOGGED TABLE {stage} AS
+            SELECT {", ".join(table_columns(table))} FROM dev.{table} WITH NO DATA;
+        """)
+        size = copy_rows(cursor, stage, table_columns(table), table_rows)
+        conn.commit()
+    if metrics is not None:
+        metrics.add_bytes(table, size)
+    return stage, time.perf_counter() - start
+
+def stage_child_tables(rows, metrics=None):
+    """
+    COPY the four child tables concurrently into unlogged staging tables, each
+    on its own pooled connection. Returns {table: staging table} and the
+    seconds each table took. The dev tables are not touched; drop the staging
+    tables with drop_staged_tables once they have been merged.
+    """
+    stages, timings, errors = {}, {}, []
+    with ThreadPoolExecutor(max_workers=len(CHILD_TABLES)) as executor:
+        futures = {
+            table: executor.submit(_stage_child_table, table, rows[table], metrics)
+            for table in CHILD_TABLES
+        }
+        for table, future in futures.items():
+            try:
+                stages[table], timings[table] = future.result()
+            except Exception as e:
+                errors.append(e)
+    if errors:
+        drop_staged_tables(stages.values())
+        raise errors[0]
+    return stages, timings
+
+def drop_staged_tables(stages):
+    with connection() as conn:
+        conn.cursor().execute("".join(f"DROP TABLE IF EXISTS {stage};" for stage in stages))
+        conn.commit()
+
+def bulk_load(conn, rows, incremental=True, parallel=False, metrics=None):
+    """
+    Load normalised rows via COPY into staging tables, then merge everything
+    into the dev tables in one transaction.
+
+    With incremental=True (the default) only new or changed beers are loaded:
+    their beer row is upserted and their child rows are replaced, so unchanged
+    beers cost nothing beyond the hash lookup. With incremental=False only
+    beers not stored yet are loaded and existing ones are left untouched, so
+    re-running a load never duplicates their child rows.
+
+    With parallel=True the child tables are COPYed concurrently into unlogged
+    staging tables first (see stage_child_tables), so the COPYs take about as
+    long as the slowest table rather than the sum of all of them. The merge is
+    still a single transaction, so readers never see a beer without its
+    ingredients and a failed load leaves the dev tables as they were.
+
+    Either way the hop/malt dimensions and bridge tables of the loaded beers
+    are refreshed (see refresh_ingredient_dims) in the same transaction.
+    Returns the seconds spent per table; rows and COPY bytes written go to
+    metrics, if given.
+    """
+    print("Bulk loading beer records ...")
+    timings = {}
+    child_stages = {}
+    try:
+        cursor = conn.cursor()
+        if incremental:
+            changed = changed_beer_ids(cursor, rows["raw_beer_data"])
+            if not changed:
+                conn.commit()
+                print("✅ No new or changed beers, nothing to load")
+                return timings
+            rows = filter_rows(rows, changed)
+            print(f"{len(changed)} new or changed beers")
+        else:
+            new = new_beer_ids(cursor, rows["raw_beer_data"])
+            if not new:
+                conn.commit()
+                print("✅ No new beers, nothing to load")
+                return timings
+            rows = filter_rows(rows, new)
+            print(f"{len(new)} new beers")
+
+        if parallel:
+            child_stages, child_timings = stage_child_tables(rows, metrics)
+            timings.update(child_timings)
+
+        start = time.perf_counter()
+        staged = ["raw_beer_data"] if parallel else ["raw_beer_data", *CHILD_TABLES]
+        columns = {table: ", ".join(table_columns(table)) for table in ["raw_beer_data", *CHILD_TABLES]}
+        cursor.execute("".join(f"""
+            CREATE TEMP TABLE stage_{table} ON COMMIT DROP AS
+            SELECT {columns[table]} FROM dev.{table} WITH NO DATA;
+        """ for table in staged))
+        for table in staged:
+            size = copy_rows(cursor, f"stage_{table}", table_columns(table), rows[table])
+            if metrics is not None:
+                metrics.add_bytes(table, size)
+        sources = {table: child_stages.get(table, f"stage_{table}") for table in CHILD_TABLES}
+
+        if incremental:
+            updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in table_columns("raw_beer_data")[1:])
+            merge = f"""
+                INSERT INTO dev.raw_beer_data({columns["raw_beer_data"]}, inserted_at)
+                SELECT DISTINCT ON (beer_id) {columns["raw_beer_data"]}, NOW() FROM stage_raw_beer_data
+                ON CONFLICT (beer_id) DO UPDATE SET {updates}, inserted_at = EXCLUDED.inserted_at;
+            """ + "".join(f"""
+                DELETE FROM dev.{table} t USING stage_raw_beer_data s WHERE t.beer_id = s.beer_id;
+            """ for table in CHILD_TABLES)
+        else:
+            merge = f"""
+                INSERT INTO dev.raw_beer_data({columns["raw_beer_data"]}, inserted_at)
+                SELECT {columns["raw_beer_data"]}, NOW() FROM stage_raw_beer_data
+                ON CONFLICT (beer_id) DO NOTHING;
+            """
+        cursor.execute(merge + "".join(f"""
+            INSERT INTO dev.{table}({columns[table]})
+            SELECT {columns[table]} FROM {sources[table]};
+        """ for table in CHILD_TABLES))
+        refresh_ingredient_dims(cursor, [beer_id for beer_id, _ in beer_hashes(rows["raw_beer_data"])])
+        conn.commit()
     except Exception as e:
-        print(f"Error: {e}")
-    finally: 
-        if 'conn' in locals():
-            conn.close()
-            print("Database connection closed")
+        conn.rollback()
+        print(f"Error bulk loading values: {e}")
+        raise
+    finally:
+        if child_stages:
+            drop_staged_tables(child_stages.values())
+    timings["raw_beer_data"] = time.perf_counter() - start
+
+    if parallel:
+        for table in ["raw_beer_data", *CHILD_TABLES]:
+            print(f"  {table}: {len(rows[table])} rows in {timings[table]:.3f}s")
+    if metrics is not None:
+        for table in ["raw_beer_data", *CHILD_TABLES]:
+            metrics.add_rows(table, len(rows[table]))
+    print(f"✅ Bulk loaded {len(rows['raw_beer_data'])} beers and "
+          f"{sum(len(rows[t]) for t in CHILD_TABLES)} ingredient/pairing rows into DB")
+    return timings
+
+def stream_load(conn, per_page=80, max_workers=FETCH_WORKERS, queue_size=PAGE_QUEUE_SIZE,
+                incremental=True, parallel=False, cache=None, client=None, metrics=None,
+                base_url=BASE_URL):
+    """
+    Fetch pages on a background thread and normalise/load each page as soon as
+    it arrives, so the database works while the next pages download. The
+    bounded queue pauses fetching when loading falls behind.
+
+    With metrics, the fetch, normalise and load stages are timed separately;
+    fetch overlaps the other two, so the stages add up to more than the run.
+    """
+    metrics = metrics if metrics is not None else RunMetrics("punkapi")
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+    errors = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            pages_iter = iter_beer_pages(per_page, max_workers, base_url, cache=cache, client=client)
+            for beers in metrics.timed("fetch", pages_iter):
+                if not put(beers):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(done)
+
+    producer = threading.Thread(target=produce, name="punkapi-fetch", daemon=True)
+    producer.start()
+    total = 0
+    try:
+        while (beers := pages.get()) is not done:
+            with metrics.stage("normalise"):
+                rows = rows_by_table(beers)
+            with metrics.stage("load"):
+                bulk_load(conn, rows, incremental=incremental, parallel=parallel, metrics=metrics)
+            total += len(beers)
+    finally:
+        stop.set()
+        producer.join()
+    if errors:
+        raise errors[0]
+    return total
+
+def main(incremental=True, parallel=False):
+    """
+    Fetch and load the whole catalogue; returns the run's metrics summary
+    (Airflow pushes it to XCom).
+    """
+    with RunMetrics("punkapi") as metrics:
+        try: 
+            conn = connect_db()
+            with metrics.stage("create_tables"):
+                create_tables(conn)
+            cache = HttpCache()
+            with HttpClient(pool_size=FETCH_WORKERS) as client:
+                metrics.record_http(client.metrics)
+                total = stream_load(conn, incremental=incremental, parallel=parallel,
+                                    cache=cache, client=client, metrics=metrics)
+            print(f"Fetched and loaded {total} beers from API")
+            print(f"HTTP cache: {cache.summary()}")
+            print(f"HTTP: {client.metrics.summary()}")
+        except Exception as e:
+            print(f"Error: {e}")
+            raise  # fail the Airflow task rather than report a partial load as success
+        finally: 
+            if 'conn' in locals():
+                print(f"{conn.statements} statements in {conn.statement_seconds:.2f}s")
+                checkin(conn)
+                print("Database connection returned to pool")
+            summary = metrics.export()
+    return summary
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,159 @@
+"""
+Flatten PunkAPI beer payloads into typed rows for every dev table in a single pass.
+"""
+import hashlib
+import json
+from typing import NamedTuple, Optional
+
+class BeerRow(NamedTuple):
+    beer_id: int
+    name: Optional[str]
+    tagline: Optional[str]
+    first_brewed: Optional[str]
+    description: Optional[str]
+    image: Optional[str]
+    abv: Optional[float]
+    ibu: Optional[float]
+    ebc: Optional[float]
+    ph: Optional[float]
+    brewers_tips: Optional[str]
+    contributed_by: Optional[str]
+    content_hash: str
+
+class MaltRow(NamedTuple):
+    beer_id: int
+    malt_name: Optional[str]
+    amount_value: Optional[float]
+    amount_unit: Optional[str]
+
+class HopRow(NamedTuple):
+    beer_id: int
+    hop_name: Optional[str]
+    amount_value: Optional[float]
+    amount_unit: Optional[str]
+    add_stage: Optional[str]
+    attribute: Optional[str]
+
+class YeastRow(NamedTuple):
+    beer_id: int
+    yeast_name: str
+
+class PairingRow(NamedTuple):
+    beer_id: int
+    pairing: Optional[str]
+
+# Target table (in the dev schema) for each row type; field names match the table columns.
+ROW_TABLES = {
+    BeerRow: "raw_beer_data",
+    MaltRow: "malt_ingredients",
+    HopRow: "hop_ingredients",
+    YeastRow: "yeast_ingredients",
+    PairingRow: "food_pairings",
+}
+
+def _float(value):
+    return None if value is None else float(value)
+
+def content_hash(beer):
+    """
+    Stable hash of a beer's full payload, used to detect changed beers between runs.
+    """
+    payload = json.dumps(beer, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def normalise_beer(beer):
+    """
+    Yield the BeerRow followed by every ingredient and pairing row of one beer.
+    """
+    beer_id = beer["id"]
+    yield BeerRow(
+        beer_id,
+        beer["name"],
+        beer["tagline"],
+        beer["first_brewed"],
+        beer["description"],
+        beer.get("image"),
+        _float(beer.get("abv")),
+        _float(beer.get("ibu")),
+        _float(beer.get("ebc")),
+        _float(beer.get("ph")),
+        beer.get("brewers_tips"),
+        beer.get("contributed_by"),
+        content_hash(beer),
+    )
+
+    ingredients = beer.get("ingredients", {})
+    for malt in ingredients.get("malt", []):
+        amount = malt.get("amount", {})
+        yield MaltRow(beer_id, malt.get("name"), _float(amount.get("value")), amount.get("unit"))
+    for hop in ingredients.get("hops", []):
+        amount = hop.get("amount", {})
+        yield HopRow(
+            beer_id,
+            hop.get("name"),
+            _float(amount.get("value")),
+            amount.get("unit"),
+            hop.get("add"),
+            hop.get("attribute"),
+        )
+    yeast = ingredients.get("yeast")
+    if yeast:
+        yield YeastRow(beer_id, yeast)
+    for pairing in beer.get("food_pairing", []):
+        yield PairingRow(beer_id, pairing)
+
+def iter_rows(beers):
+    """
+    Stream typed rows for all target tables from an iterable of beers.
+    """
+    for beer in beers:
+        yield from normalise_beer(beer)
+
+def rows_by_table(beers):
+    """
+    Group the normalised rows of beers by target table name.
+    """
+    tables = {table: [] for table in ROW_TABLES.values()}
+    for row in iter_rows(beers):
+        tables[ROW_TABLES[type(row)]].append(row)
+    return tables
+
+def is_arrow(table_rows):
+    """
+    True for a pyarrow Table (as read back from the DAG's Parquet artifacts).
+    """
+    return hasattr(table_rows, "column_names")
+
+def filter_rows(rows, beer_ids):
+    """
+    Keep only the rows of the given beers in a rows_by_table() result.
+    Tables may be lists of rows or pyarrow Tables.
+    """
+    beer_ids = set(beer_ids)
+    filtered = {}
+    for table, table_rows in rows.items():
+        if is_arrow(table_rows):
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            value_set = pa.array(sorted(beer_ids), type=table_rows.schema.field("beer_id").type)
+            filtered[table] = table_rows.filter(pc.is_in(table_rows["beer_id"], value_set=value_set))
+        else:
+            filtered[table] = [row for row in table_rows if row.beer_id in beer_ids]
+    return filtered
+
+def beer_hashes(beer_rows):
+    """
+    (beer_id, content_hash) pairs of a list of BeerRows or a pyarrow Table of them.
+    """
+    if is_arrow(beer_rows):
+        return list(zip(beer_rows["beer_id"].to_pylist(), beer_rows["content_hash"].to_pylist()))
+    return [(row.beer_id, row.content_hash) for row in beer_rows]
+
+def table_columns(table):
+    """
+    Column names of a target table, taken from its row type.
+    """
+    for row_type, name in ROW_TABLES.items():
+        if name == table:
+            return list(row_type._fields)
+    raise KeyError(table)
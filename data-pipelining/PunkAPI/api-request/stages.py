@@ -0,0 +1,162 @@
+"""
+The beer pipeline split into fetch -> normalise -> load stages for Airflow.
+
+Each stage writes its output under ARTIFACT_DIR/<run_id>/ and the next stage
+reads it back, so a retried task resumes from the last completed stage instead
+of re-fetching the whole catalogue:
+
+  fetch      raw API pages          -> beers.jsonl
+  normalise  typed rows per table   -> <table>.parquet (one file per dev table)
+  load       Parquet (memory-mapped) -> Postgres via COPY
+
+Every stage returns its metrics summary (see metrics.py), which Airflow pushes
+to XCom.
+"""
+import json
+import os
+import re
+import shutil
+import typing
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from api_request import iter_beer_pages
+from db_pool import connection
+from http_cache import HttpCache
+from http_client import HttpClient
+from insert_records import FETCH_WORKERS, bulk_load, create_tables
+from metrics import RunMetrics
+from normalise import ROW_TABLES, rows_by_table
+
+ARTIFACT_DIR = os.getenv("PUNKAPI_ARTIFACT_DIR", "/opt/airflow/artifacts/punkapi")
+KEEP_RUNS = int(os.getenv("PUNKAPI_KEEP_RUNS", "24"))  # a day of hourly runs
+
+BEERS_FILE = "beers.jsonl"
+LOADED_MARKER = "_LOADED"
+
+_ARROW_TYPES = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+
+def arrow_schema(row_type):
+    """
+    Arrow schema of a normalise row type; Optional fields become nullable.
+    """
+    fields = []
+    for name, hint in typing.get_type_hints(row_type).items():
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        base = args[0] if args else hint
+        fields.append(pa.field(name, _ARROW_TYPES[base], nullable=bool(args)))
+    return pa.schema(fields)
+
+def to_arrow(row_type, rows):
+    """
+    Convert a list of rows of row_type into a pyarrow Table, column by column.
+    """
+    schema = arrow_schema(row_type)
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+def run_dir(run_id):
+    """
+    Artifact directory of one DAG run (run ids contain ':' and '+').
+    """
+    return os.path.join(ARTIFACT_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", run_id))
+
+def _done(path):
+    if os.path.exists(path):
+        print(f"⏭️ {os.path.basename(path)} already written for this run, skipping")
+        return True
+    return False
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.tmp"
+
+def fetch_stage(run_id):
+    """
+    Fetch every page and write the raw beers, one JSON object per line.
+    """
+    path = os.path.join(run_dir(run_id), BEERS_FILE)
+    with RunMetrics("punkapi", "fetch") as metrics:
+        if not _done(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cache = HttpCache()
+            total = 0
+            tmp = _tmp_path(path)
+            with HttpClient(pool_size=FETCH_WORKERS) as client, open(tmp, "w") as f:
+                metrics.record_http(client.metrics)
+                pages = iter_beer_pages(max_workers=FETCH_WORKERS, cache=cache, client=client)
+                for beers in metrics.timed("fetch", pages):
+                    for beer in beers:
+                        f.write(json.dumps(beer))
+                        f.write("\n")
+                    total += len(beers)
+            os.replace(tmp, path)
+            metrics.add_rows(BEERS_FILE, total)
+            metrics.add_bytes(BEERS_FILE, os.path.getsize(path))
+            print(f"✅ Fetched {total} beers to {path} (cache: {cache.summary()})")
+            print(f"HTTP: {client.metrics.summary()}")
+    return {**metrics.export(), "artifact": path}
+
+def normalise_stage(run_id):
+    """
+    Normalise the fetched beers into one Parquet file per dev table.
+    """
+    directory = run_dir(run_id)
+    paths = {table: os.path.join(directory, f"{table}.parquet") for table in ROW_TABLES.values()}
+    with RunMetrics("punkapi", "normalise") as metrics:
+        if all(os.path.exists(path) for path in paths.values()):
+            print("⏭️ Parquet tables already written for this run, skipping")
+        else:
+            with metrics.stage("normalise"), open(os.path.join(directory, BEERS_FILE)) as f:
+                rows = rows_by_table(json.loads(line) for line in f)
+
+            with metrics.stage("write_parquet"):
+                for row_type, table in ROW_TABLES.items():
+                    tmp = _tmp_path(paths[table])
+                    pq.write_table(to_arrow(row_type, rows[table]), tmp)
+                    os.replace(tmp, paths[table])
+                    metrics.add_rows(table, len(rows[table]))
+                    metrics.add_bytes(table, os.path.getsize(paths[table]))
+                    print(f"✅ Wrote {len(rows[table])} rows to {paths[table]}")
+    return {**metrics.export(), "artifacts": paths}
+
+def load_stage(run_id, incremental=True, parallel=True):
+    """
+    Load the run's Parquet tables into Postgres, then prune old run directories.
+    """
+    directory = run_dir(run_id)
+    marker = os.path.join(directory, LOADED_MARKER)
+    with RunMetrics("punkapi", "load") as metrics:
+        if not _done(marker):
+            with metrics.stage("read_parquet"):
+                rows = {
+                    table: pq.read_table(os.path.join(directory, f"{table}.parquet"), memory_map=True)
+                    for table in ROW_TABLES.values()
+                }
+            with connection() as conn:
+                with metrics.stage("create_tables"):
+                    create_tables(conn)
+                with metrics.stage("load"):
+                    bulk_load(conn, rows, incremental=incremental, parallel=parallel, metrics=metrics)
+                print(f"⏱️ {conn.statements} statements, {conn.statement_seconds:.2f}s in the database")
+
+            open(marker, "w").close()
+            prune_runs()
+    return metrics.export()
+
+def prune_runs(keep=KEEP_RUNS):
+    """
+    Delete all but the newest keep loaded run directories.
+    """
+    if not os.path.isdir(ARTIFACT_DIR):
+        return
+    loaded = [
+        os.path.join(ARTIFACT_DIR, name) for name in os.listdir(ARTIFACT_DIR)
+        if os.path.exists(os.path.join(ARTIFACT_DIR, name, LOADED_MARKER))
+    ]
+    loaded.sort(key=os.path.getmtime, reverse=True)
+    for directory in loaded[keep:]:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,46 @@
+"""
+Compare serial and concurrent fetch_all_beers against the local fake PunkAPI.
+
+    python benchmarks/bench_fetch.py --beers 2000 --latency 0.05 --workers 8
+    python benchmarks/bench_fetch.py --error-rate 0.2   # with transient 503s
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "api-request"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "common"))
+from api_request import fetch_all_beers  # noqa: E402
+from fake_punkapi import FakePunkAPI  # noqa: E402
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--beers", type=int, default=2000)
+    parser.add_argument("--per-page", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    with FakePunkAPI(total=args.beers, latency=args.latency, error_rate=args.error_rate) as api:
+        serial, serial_s = timed(fetch_all_beers, args.per_page, base_url=api.base_url)
+        concurrent, concurrent_s = timed(
+            fetch_all_beers, args.per_page, max_workers=args.workers, base_url=api.base_url
+        )
+
+    assert concurrent == serial, "concurrent fetch does not match the serial path"
+    print(f"\nbeers={len(serial)} per_page={args.per_page} latency={args.latency}s")
+    print(f"serial:     {serial_s:.3f}s")
+    print(f"concurrent: {concurrent_s:.3f}s ({args.workers} workers)")
+    print(f"speedup:    {serial_s / concurrent_s:.1f}x")
+    if args.error_rate:
+        print(f"503s:       {api.errors} of {api.requests} requests, all retried")
+
+if __name__ == "__main__":
+    main()
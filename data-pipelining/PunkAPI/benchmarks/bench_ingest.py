@@ -0,0 +1,178 @@
+"""
+Time the PunkAPI ingest end to end and per stage against local stand-ins.
+
+    DB_HOST=localhost DB_NAME=bench DB_USER=postgres DB_PASSWORD=... \
+        python benchmarks/bench_ingest.py --beers 10000
+    python benchmarks/bench_ingest.py --beers 1000000 --stages stream
+
+The fake PunkAPI (fake_punkapi.py) generates each page on request, so even a
+1M-beer catalogue costs nothing up front. Rows go to the Postgres named by the
+DB_* variables (see common/db_pool.py). The dev tables are TRUNCATED
+between stages, so point DB_NAME at a scratch database; the script refuses to
+run unless DB_NAME is set explicitly.
+
+Stages (run in this order, pick with --stages):
+  fetch        fetch_all_beers with --workers concurrent requests
+  normalise    rows_by_table
+  insert       each legacy insert_* function (executemany)
+  copy         bulk_load(incremental=False) (COPY into staging tables, one transaction)
+  parallel     bulk_load(incremental=False, parallel=True)
+  incremental  bulk_load(incremental=True) over an unchanged catalogue
+  stream       stream_load: fetch, normalise and load overlapped, bounded memory
+
+Each line reports seconds, rows/s and the peak RSS of the process so far.
+Peak RSS only grows, so run memory-sensitive stages (stream) on their own.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "api-request"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "common"))
+from api_request import fetch_all_beers  # noqa: E402
+from db_pool import checkin, checkout  # noqa: E402
+from fake_punkapi import FakePunkAPI  # noqa: E402
+from insert_records import (  # noqa: E402
+    CHILD_TABLES, FETCH_WORKERS, INGREDIENT_DIMS, bulk_load, create_tables, insert_food_pairings,
+    insert_hop_ingredients, insert_malt_ingredients, insert_records,
+    insert_yeast_ingredients, stream_load,
+)
+from normalise import rows_by_table  # noqa: E402
+
+STAGES = ["fetch", "normalise", "insert", "copy", "parallel", "incremental", "stream"]
+
+# legacy per-table insert functions, parents first for the foreign keys
+INSERTS = [
+    ("raw_beer_data", insert_records),
+    ("malt_ingredients", insert_malt_ingredients),
+    ("hop_ingredients", insert_hop_ingredients),
+    ("yeast_ingredients", insert_yeast_ingredients),
+    ("food_pairings", insert_food_pairings),
+]
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS).
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def truncate(conn):
+    """
+    Empty every dev table, bridges and ingredient dimensions included, and reset their keys.
+    """
+    tables = ["raw_beer_data", *CHILD_TABLES]
+    for _, _, dim_table, _, bridge_table in INGREDIENT_DIMS:
+        tables += [bridge_table, dim_table]
+    cursor = conn.cursor()
+    cursor.execute(f"TRUNCATE {', '.join('dev.' + t for t in tables)} RESTART IDENTITY;")
+    conn.commit()
+
+def total_rows(rows):
+    return sum(len(table_rows) for table_rows in rows.values())
+
+class Bench:
+    """
+    Runs and records timed steps, with the ingest code's progress output silenced.
+    """
+    def __init__(self):
+        self.results = []
+
+    def time(self, stage, step, fn, *args, rows=None, **kwargs):
+        with quiet():
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            seconds = time.perf_counter() - start
+        count = rows(result) if callable(rows) else rows
+        self.record(stage, step, seconds, count)
+        return result
+
+    def record(self, stage, step, seconds, count):
+        self.results.append({
+            "stage": stage,
+            "step": step,
+            "seconds": round(seconds, 4),
+            "rows": count,
+            "rows_per_second": round(count / seconds, 1) if count and seconds else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+        r = self.results[-1]
+        print(f"{stage:<12} {step:<26} {seconds:>9.3f}s {count or 0:>10} rows "
+              f"{r['rows_per_second'] or 0:>12,.0f} rows/s {r['peak_rss_mb']:>9.1f} MiB")
+
+    def seconds(self, *stages):
+        return sum(r["seconds"] for r in self.results if r["stage"] in stages)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--beers", type=int, default=10000, help="catalogue size (1k-1M)")
+    parser.add_argument("--per-page", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per API request")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {STAGES}")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    if "DB_NAME" not in os.environ:
+        parser.error("set DB_NAME (and DB_HOST, DB_USER, ...) to a scratch database; the dev tables get truncated")
+
+    bench = Bench()
+    print(f"beers={args.beers} per_page={args.per_page} latency={args.latency}s workers={args.workers}\n")
+    with FakePunkAPI(total=args.beers, latency=args.latency) as api:
+        conn = checkout()
+        try:
+            create_tables(conn)
+            beers = rows = None
+            if set(stages) - {"stream"}:
+                beers = bench.time("fetch", "fetch_all_beers", fetch_all_beers, args.per_page,
+                                   max_workers=args.workers, base_url=api.base_url, rows=len)
+                rows = bench.time("normalise", "rows_by_table", rows_by_table, beers, rows=total_rows)
+
+            if "insert" in stages:
+                truncate(conn)
+                for table, insert in INSERTS:
+                    bench.time("insert", insert.__name__, insert, conn, rows, rows=len(rows[table]))
+                bench.record("insert", "end to end (fetch..insert)",
+                             bench.seconds("fetch", "normalise", "insert"), total_rows(rows))
+
+            for stage, kwargs in [("copy", {"incremental": False}),
+                                  ("parallel", {"incremental": False, "parallel": True})]:
+                if stage in stages:
+                    truncate(conn)
+                    bench.time(stage, "bulk_load", bulk_load, conn, rows, rows=total_rows(rows), **kwargs)
+
+            if "incremental" in stages:
+                truncate(conn)
+                with quiet():
+                    bulk_load(conn, rows, incremental=True)  # first load stores the hashes
+                bench.time("incremental", "bulk_load (unchanged)", bulk_load, conn, rows,
+                           incremental=True, rows=total_rows(rows))
+
+            if "stream" in stages:
+                del beers, rows
+                truncate(conn)
+                bench.time("stream", "stream_load (beers)", stream_load, conn, args.per_page,
+                           max_workers=args.workers, base_url=api.base_url, rows=lambda total: total)
+        finally:
+            checkin(conn)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": bench.results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
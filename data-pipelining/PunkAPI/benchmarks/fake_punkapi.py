@@ -0,0 +1,135 @@
+"""
+Local stand-in for the PunkAPI /v3/beers endpoint, for benchmarks.
+
+Serves a synthetic catalogue of `total` beers with the same shape as the real
+API and an optional per-request delay to mimic network latency. Responses carry
+an ETag and If-None-Match is answered with 304. With error_rate set, that share
+of requests fails with 503 + Retry-After to exercise the client's retries.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+def make_beer(beer_id):
+    """
+    Build one deterministic synthetic beer payload.
+
+    Every 50th beer has null text fields, as some real PunkAPI beers do.
+    """
+    beer = {
+        "id": beer_id,
+        "name": f"Beer {beer_id}",
+        "tagline": ["Pale Ale.", "Imperial Stout.", "Pilsner Lager.", "Wheat Beer."][beer_id % 4],
+        "first_brewed": f"{1 + beer_id % 12:02d}/{2007 + beer_id % 12}",
+        "description": f"Synthetic beer number {beer_id}.",
+        "image": f"{beer_id:03d}.png",
+        "abv": round(4 + (beer_id % 60) / 10, 1),
+        "ibu": float(10 + beer_id % 90),
+        "ebc": float(5 + beer_id % 40),
+        "ph": 4.4,
+        "ingredients": {
+            "malt": [
+                {"name": f"Malt {beer_id % 17}", "amount": {"value": 3.3, "unit": "kilograms"}},
+                {"name": f"Malt {beer_id % 5}", "amount": {"value": 0.2, "unit": "kilograms"}},
+            ],
+            "hops": [
+                {"name": f"Hop {beer_id % 23}", "amount": {"value": 25, "unit": "grams"},
+                 "add": "start", "attribute": "bitter"},
+                {"name": f"Hop {beer_id % 11}", "amount": {"value": 12.5, "unit": "grams"},
+                 "add": "end", "attribute": "flavour"},
+            ],
+            "yeast": f"Wyeast {1000 + beer_id % 7}",
+        },
+        "food_pairing": [f"Dish {beer_id % 31}", f"Dish {beer_id % 13}", f"Cheese {beer_id % 3}"],
+        "brewers_tips": "Keep it cold.",
+        "contributed_by": f"Brewer {beer_id % 9}",
+    }
+    if beer_id % 50 == 0:
+        beer.update(tagline=None, first_brewed=None, description=None, brewers_tips=None)
+    return beer
+
+class FakePunkAPI:
+    """
+    Threaded HTTP server answering /v3/beers?page=&per_page= from a synthetic catalogue.
+    """
+    def __init__(self, total=400, latency=0.0, host="127.0.0.1", port=0, error_rate=0.0, seed=0):
+        self.total = total
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v3/beers"
+
+    def page(self, page, per_page):
+        start = (page - 1) * per_page + 1
+        stop = min(start + per_page, self.total + 1)
+        return [make_beer(i) for i in range(start, stop)]
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                api.requests += 1
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                page = int(query.get("page", ["1"])[0])
+                per_page = int(query.get("per_page", ["25"])[0])
+                if api.latency:
+                    time.sleep(api.latency)
+                if api.error_rate and api.random.random() < api.error_rate:
+                    api.errors += 1
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(api.page(page, per_page)).encode()
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == "__main__":
+    with FakePunkAPI() as api:
+        print(f"Serving fake PunkAPI at {api.base_url} (Ctrl+C to stop)")
+        try:
+            api.thread.join()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,61 @@
+{#
+    Helpers for aggregate marts that are rebuilt only when beers were (re)loaded.
+
+    Such models are incremental with a refreshed_at = now() column: on an
+    incremental run the select is filtered by beers_changed_since_refresh(),
+    so it returns nothing when no beer changed, and a full recompute otherwise.
+    The delete_stale_rows() post-hook then drops the rows of the previous
+    refresh, all inside the model's transaction.
+
+    Tables built before these columns existed have no refreshed_at/inserted_at
+    yet: the filters treat them as "everything changed" and on_schema_change
+    (dbt_project.yml) adds the column, so no --full-refresh is needed.
+#}
+
+{% macro has_column(column) %}
+    {%- if not execute -%}
+        {{ return(false) }}
+    {%- endif -%}
+    {%- set relation = adapter.get_relation(this.database, this.schema, this.identifier) -%}
+    {%- if relation is none -%}
+        {{ return(false) }}
+    {%- endif -%}
+    {{ return(column in adapter.get_columns_in_relation(relation) | map(attribute='name') | list) }}
+{% endmacro %}
+
+{% macro newer_than_this(column='inserted_at') %}
+    {%- if has_column(column) -%}
+        {{ column }} > (select coalesce(max({{ column }}), '-infinity') from {{ this }})
+    {%- else -%}
+        true
+    {%- endif -%}
+{% endmacro %}
+
+{% macro beers_changed_since_refresh() %}
+    {%- if has_column('refreshed_at') -%}
+    exists (
+        select 1
+        from {{ source('dev', 'raw_beer_data') }}
+        where inserted_at > (select coalesce(max(refreshed_at), '-infinity') from {{ this }})
+    )
+    {%- else -%}
+    true
+    {%- endif -%}
+{% endmacro %}
+
+{% macro delete_stale_rows() %}
+    {#-
+        now() is this refresh's refreshed_at (same transaction). If a beer
+        changed since the previous refresh, the model recomputed, so every
+        older row goes, even when the recompute returned no rows at all.
+    -#}
+    delete from {{ this }}
+    where (refreshed_at is null or refreshed_at < now())
+      and exists (
+        select 1
+        from {{ source('dev', 'raw_beer_data') }}
+        where inserted_at > (
+            select coalesce(max(refreshed_at), '-infinity') from {{ this }} where refreshed_at < now()
+        )
+      )
+{% endmacro %}
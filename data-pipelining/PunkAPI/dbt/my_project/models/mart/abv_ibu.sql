@@ -1,8 +1,16 @@
-{{ config(materialized='table', schema='dev') }}
+{{ config(
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
 
 select
     abv,
     ibu,
-    type
+    type,
+    now() as refreshed_at
 from {{ ref('beer_types') }}
 where abv is not null and ibu is not null
+{% if is_incremental() %}
+    and {{ beers_changed_since_refresh() }}
+{% endif %}
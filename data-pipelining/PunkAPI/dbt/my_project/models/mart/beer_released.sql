@@ -1,10 +1,18 @@
-{{ config(materialized='table', schema='dev') }}
+{{ config(
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
 
 select
     left(coalesce(nullif(trim(first_brewed),''), '0000'), 4) as year,
-    count(*) as beer_count
+    count(*) as beer_count,
+    now() as refreshed_at
 from {{ ref('beer_types') }}
 where
     left(coalesce(nullif(trim(first_brewed),''), '0000'), 4) ~ '^\d{4}$'
+    {% if is_incremental() %}
+    and {{ beers_changed_since_refresh() }}
+    {% endif %}
 group by year
 order by year
@@ -1,4 +1,7 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
 
 with beers as (
     select * from {{ ref('staging') }}
@@ -18,5 +21,10 @@ select
     round(avg(ph)::numeric, 2) as avg_ph,
     min(first_brewed) as oldest_brew,
     max(first_brewed) as newest_brew,
-    count(distinct contributed_by) as unique_contributors
+    count(distinct contributed_by) as unique_contributors,
+    now() as refreshed_at
 from beers
+{% if is_incremental() %}
+-- no group by, so filter the single summary row with having
+having {{ beers_changed_since_refresh() }}
+{% endif %}
@@ -1,5 +1,6 @@
 {{ config(
-    materialized='table',
+    materialized='incremental',
+    unique_key='beer_id',
     schema='dev'
 ) }}
 
@@ -21,5 +22,9 @@ select
         when lower(tagline) like '%ale%' then 'Ale'
         when lower(tagline) like '%wheat%' then 'Ale'
         else 'Other'
-    end as type
+    end as type,
+    inserted_at
 from {{ source('dev', 'raw_beer_data') }}
+{% if is_incremental() %}
+where {{ newer_than_this('inserted_at') }}
+{% endif %}
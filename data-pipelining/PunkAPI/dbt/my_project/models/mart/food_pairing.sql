@@ -1,9 +1,17 @@
-{{ config(materialized='table', schema='dev') }}
+{{ config(
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
 
 select
     pairing,
-    count(*) as pairing_count
+    count(*) as pairing_count,
+    now() as refreshed_at
 from {{ source('dev', 'food_pairings') }}
 where pairing is not null
+{% if is_incremental() %}
+    and {{ beers_changed_since_refresh() }}
+{% endif %}
 group by pairing
 order by pairing_count desc
@@ -1,9 +1,13 @@
 {{ config(
-    materialized='table'
+    materialized='incremental',
+    unique_key='beer_id'
 ) }}
 
 with beers as (
     select * from {{ ref('staging') }}
+    {% if is_incremental() %}
+    where {{ newer_than_this('inserted_at') }}
+    {% endif %}
 )
 
 select
@@ -12,5 +16,6 @@ select
     tagline as category,         -- category/style approximation
     description,
     abv as alcohol_percent,
-    first_brewed
+    first_brewed,
+    inserted_at
 from beers
@@ -1,9 +1,26 @@
-{{ config(materialized='table', schema='dev') }}
+{{ config(
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
+
+-- count over the small integer beer_hop bridge (covered by
+-- beer_hop_hop_key_idx) and join the names on afterwards
+with hop_counts as (
+    select
+        hop_key,
+        count(*) as beers_with_hop
+    from {{ source('dev', 'beer_hop') }}
+    {% if is_incremental() %}
+    where {{ beers_changed_since_refresh() }}
+    {% endif %}
+    group by hop_key
+)
 
 select
-    hop_name,
-    count(distinct beer_id) as beers_with_hop
-from {{ source('dev', 'hop_ingredients') }}
-where hop_name is not null
-group by hop_name
+    d.hop_name,
+    c.beers_with_hop,
+    now() as refreshed_at
+from hop_counts c
+join {{ source('dev', 'dim_hop') }} d on d.hop_key = c.hop_key
 order by beers_with_hop desc
@@ -1,9 +1,26 @@
-{{ config(materialized='table', schema='dev') }}
+{{ config(
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
+) }}
+
+-- count over the small integer beer_malt bridge (covered by
+-- beer_malt_malt_key_idx) and join the names on afterwards
+with malt_counts as (
+    select
+        malt_key,
+        count(*) as beers_with_malt
+    from {{ source('dev', 'beer_malt') }}
+    {% if is_incremental() %}
+    where {{ beers_changed_since_refresh() }}
+    {% endif %}
+    group by malt_key
+)
 
 select
-    malt_name,
-    count(distinct beer_id) as beers_with_malt
-from {{ source('dev', 'malt_ingredients') }}
-where malt_name is not null
-group by malt_name
+    d.malt_name,
+    c.beers_with_malt,
+    now() as refreshed_at
+from malt_counts c
+join {{ source('dev', 'dim_malt') }} d on d.malt_key = c.malt_key
 order by beers_with_malt desc
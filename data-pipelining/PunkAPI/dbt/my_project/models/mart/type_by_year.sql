@@ -1,16 +1,21 @@
 {{ config(
-    materialized='table',
-    schema='dev'
+    materialized='incremental',
+    schema='dev',
+    post_hook="{{ delete_stale_rows() }}"
 ) }}
 
 select
     left(coalesce(nullif(trim(first_brewed),''), '0000'), 4) as year,
     type,
-    count(*) as beer_count
+    count(*) as beer_count,
+    now() as refreshed_at
 from {{ ref('beer_types') }}
 where
     -- Only keep non-null, non-empty years and ensure first 4 chars are digits
     left(coalesce(nullif(trim(first_brewed),''), '0000'), 4) ~ '^\d{4}$'
+    {% if is_incremental() %}
+    and {{ beers_changed_since_refresh() }}
+    {% endif %}
 group by
     left(coalesce(nullif(trim(first_brewed),''), '0000'), 4),
     type
@@ -1,11 +1,15 @@
 {{ config(
-    materialized='table',
-    unique_key='id'
+    materialized='incremental',
+    unique_key='beer_id'
 ) }}
 
 with source as (
     select * 
     from {{ source('dev','raw_beer_data') }}
+    {% if is_incremental() %}
+    -- only beers inserted or changed since the last run
+    where {{ newer_than_this('inserted_at') }}
+    {% endif %}
 )
 
 select 
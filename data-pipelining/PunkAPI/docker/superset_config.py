@@ -76,7 +76,10 @@ CACHE_CONFIG = {
     "CACHE_REDIS_PORT": REDIS_PORT,
     "CACHE_REDIS_DB": REDIS_RESULTS_DB,
 }
-DATA_CACHE_CONFIG = CACHE_CONFIG
+# Chart data only changes when the hourly DAG reloads it, and the DAG's
+# warm_cache task re-runs every chart with force=true right after dbt, so keep
+# results for a full interval instead of letting them expire after 5 minutes.
+DATA_CACHE_CONFIG = {**CACHE_CONFIG, "CACHE_DEFAULT_TIMEOUT": 3600}
 THUMBNAIL_CACHE_CONFIG = CACHE_CONFIG
 
 
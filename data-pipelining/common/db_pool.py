@@ -0,0 +1,141 @@
+"""
+Pooled Postgres connections for the ingest tasks.
+
+Connection settings come from the environment (DB_HOST, DB_PORT, DB_NAME,
+DB_USER, DB_PASSWORD, DB_POOL_MIN, DB_POOL_MAX). The pool lives for the whole
+process, so parallel loaders and repeated runs in the same worker reuse
+connections instead of opening new ones.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import extensions, pool
+
+_pool = None
+_pool_lock = threading.Lock()
+_checkout_hooks = []
+_checkin_hooks = []
+
+def db_config():
+    """
+    Connection keyword arguments for psycopg2, read from the environment.
+    """
+    return {
+        "host": os.getenv("DB_HOST", "db"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "dbname": os.getenv("DB_NAME", "db"),
+        "user": os.getenv("DB_USER", "db_user"),
+        "password": os.getenv("DB_PASSWORD", "db_password"),
+    }
+
+class TimedCursor(extensions.cursor):
+    """
+    Cursor that reports the duration of every statement to its connection.
+    """
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self.connection.record_statement(time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self.connection.record_statement(time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self.connection.record_statement(time.perf_counter() - start)
+
+class TimedConnection(extensions.connection):
+    """
+    Connection that counts its statements and the time spent in them.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TimedCursor
+        self.reset_stats()
+
+    def record_statement(self, seconds):
+        self.statements += 1
+        self.statement_seconds += seconds
+
+    def reset_stats(self):
+        self.statements = 0
+        self.statement_seconds = 0.0
+
+def get_pool():
+    """
+    Return the process-wide ThreadedConnectionPool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = pool.ThreadedConnectionPool(
+                int(os.getenv("DB_POOL_MIN", "1")),
+                int(os.getenv("DB_POOL_MAX", "6")),
+                connection_factory=TimedConnection,
+                **db_config(),
+            )
+        return _pool
+
+def add_checkout_hook(hook):
+    """
+    Call hook(conn) every time a connection is checked out of the pool.
+    """
+    _checkout_hooks.append(hook)
+
+def add_checkin_hook(hook):
+    """
+    Call hook(conn) every time a connection is returned to the pool.
+    """
+    _checkin_hooks.append(hook)
+
+def checkout():
+    """
+    Take a connection from the pool, replacing any the server has closed.
+    """
+    connections = get_pool()
+    conn = connections.getconn()
+    while conn.closed:
+        connections.putconn(conn, close=True)
+        conn = connections.getconn()
+    conn.reset_stats()
+    for hook in _checkout_hooks:
+        hook(conn)
+    return conn
+
+def checkin(conn):
+    """
+    Return a connection to the pool; any open transaction is rolled back.
+    """
+    for hook in _checkin_hooks:
+        hook(conn)
+    get_pool().putconn(conn)
+
+@contextmanager
+def connection():
+    """
+    Check out a pooled connection for the duration of a with block.
+    """
+    conn = checkout()
+    try:
+        yield conn
+    finally:
+        checkin(conn)
+
+def close_pool():
+    """
+    Close every pooled connection.
+    """
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
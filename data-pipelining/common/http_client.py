@@ -0,0 +1,183 @@
+"""
+Shared HTTP client for the ingest tasks.
+
+One keep-alive requests.Session per client, a timeout on every request, and
+retries with jittered exponential backoff on connection errors, timeouts,
+429 and 5xx responses (a Retry-After header takes precedence over the
+backoff). An optional token bucket caps the request rate across threads.
+Every client records request latency and retry counts in client.metrics.
+
+Settings come from the environment (HTTP_TIMEOUT, HTTP_MAX_RETRIES,
+HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_REQUESTS_PER_SECOND,
+HTTP_RETRY_AFTER_MAX).
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+REQUESTS_PER_SECOND = float(os.getenv("HTTP_REQUESTS_PER_SECOND", "0"))  # 0 = unlimited
+RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "300"))  # cap on server-requested waits
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average, with bursts of up to burst
+    requests. Safe to share between threads.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1  # may go negative: later callers queue behind this one
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        time.sleep(wait)
+
+class HttpMetrics:
+    """
+    Request count, retries, failures, bytes received and per-request latencies
+    of one client.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def record_request(self, seconds, size=0):
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            self.latencies.append(seconds)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def percentile(self, p):
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    def summary(self):
+        return (f"{self.requests} requests, {self.retries} retries, {self.failures} failures, "
+                f"p50 {self.percentile(50) * 1000:.0f}ms, p95 {self.percentile(95) * 1000:.0f}ms")
+
+def retry_after(response):
+    """
+    Seconds to wait according to a Retry-After header (delta-seconds or an
+    HTTP date), or None when there is no usable header.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HttpClient:
+    """
+    Keep-alive session with timeouts, retries and rate limiting.
+    get()/post() take the same arguments as requests.get/post, so the client can
+    stand in wherever a session is expected (e.g. HttpCache.get_json).
+    """
+    def __init__(self, pool_size=10, timeout=TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 requests_per_second=REQUESTS_PER_SECOND):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(requests_per_second)
+        self.metrics = HttpMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def backoff(self, attempt):
+        """
+        Full-jitter exponential backoff: uniform in [0, base * 2**attempt], capped.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, params=None, headers=None):
+        return self.request("GET", url, params=params, headers=headers)
+
+    def post(self, url, json=None, headers=None):
+        return self.request("POST", url, json=json, headers=headers)
+
+    def request(self, method, url, params=None, headers=None, json=None):
+        """
+        Send a request, retrying transient failures. After the last attempt a
+        connection error is raised and a retryable response is returned as-is
+        (callers raise_for_status() as usual).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, headers=headers,
+                                                json=json, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.record_request(time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    self.metrics.record_failure()
+                    raise
+                reason, delay = type(e).__name__, self.backoff(attempt)
+            else:
+                self.metrics.record_request(time.perf_counter() - start, len(response.content))
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                if attempt == self.max_retries:
+                    self.metrics.record_failure()
+                    return response
+                reason = f"HTTP {response.status_code}"
+                delay = retry_after(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                delay = min(delay, RETRY_AFTER_MAX)
+            self.metrics.record_retry()
+            print(f"🔁 {reason} for {url}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
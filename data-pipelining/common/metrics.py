@@ -0,0 +1,241 @@
+"""
+Run metrics for the ingest tasks.
+
+A RunMetrics collects stage durations, rows and bytes written per table, HTTP
+request latencies (from an HttpClient's metrics) and database round trips
+(from every pooled TimedConnection checked in while the run is active).
+export() writes them as a Prometheus textfile and/or StatsD packets and returns
+a JSON-friendly summary, which Airflow pushes to XCom as the task's return value.
+
+Outputs are enabled from the environment:
+  METRICS_TEXTFILE_DIR  directory scraped by node_exporter's textfile collector
+  STATSD_HOST / STATSD_PORT  StatsD daemon (UDP)
+"""
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from db_pool import add_checkin_hook
+
+TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR")
+STATSD_HOST = os.getenv("STATSD_HOST")
+STATSD_PORT = int(os.getenv("STATSD_PORT", "8125"))
+PREFIX = os.getenv("METRICS_PREFIX", "ingest")
+
+# upper bounds (seconds) of the HTTP latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+_DONE = object()
+_active = []
+_active_lock = threading.Lock()
+
+def _on_checkin(conn):
+    with _active_lock:
+        runs = list(_active)
+    for run in runs:
+        run.record_db(conn)
+
+add_checkin_hook(_on_checkin)
+
+class RunMetrics:
+    """
+    Metrics of one ingest task run. Use as a context manager so connections
+    returned to the pool during the run are counted.
+    """
+    def __init__(self, pipeline, task="ingest"):
+        self.pipeline = pipeline
+        self.task = task
+        self.stages = {}
+        self.rows = {}
+        self.bytes = {}
+        self.http = None
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with _active_lock:
+            _active.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _active_lock:
+            _active.remove(self)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block; repeated blocks of the same stage add up.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def timed(self, name, iterable):
+        """
+        Yield from iterable, counting the time spent producing each item
+        (not the time the consumer holds it) towards the stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_rows(self, table, count):
+        with self.lock:
+            self.rows[table] = self.rows.get(table, 0) + count
+
+    def add_bytes(self, name, count):
+        with self.lock:
+            self.bytes[name] = self.bytes.get(name, 0) + count
+
+    def record_http(self, http_metrics):
+        self.http = http_metrics
+
+    def record_db(self, conn):
+        with self.lock:
+            self.db_statements += conn.statements
+            self.db_seconds += conn.statement_seconds
+
+    def summary(self):
+        duration = time.perf_counter() - self.started
+        rows = sum(self.rows.values())
+        load_seconds = self.stages.get("load", 0.0)
+        summary = {
+            "pipeline": self.pipeline,
+            "task": self.task,
+            "duration_seconds": round(duration, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "rows": dict(self.rows),
+            "rows_per_second": round(rows / load_seconds, 1) if load_seconds else None,
+            "bytes": dict(self.bytes),
+            "db_statements": self.db_statements,
+            "db_seconds": round(self.db_seconds, 3),
+        }
+        if self.http is not None:
+            summary["http"] = {
+                "requests": self.http.requests,
+                "retries": self.http.retries,
+                "failures": self.http.failures,
+                "bytes": self.http.bytes,
+                "p50_seconds": round(self.http.percentile(50), 4),
+                "p95_seconds": round(self.http.percentile(95), 4),
+            }
+        return summary
+
+    def _labels(self, **extra):
+        labels = {"pipeline": self.pipeline, "task": self.task, **extra}
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+    def prometheus_text(self):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{suffix}{labels} {value}")
+
+        metric("run_duration_seconds", "gauge", "Wall time of the last run.",
+               [("", self._labels(), time.perf_counter() - self.started)])
+        metric("stage_duration_seconds", "gauge", "Time spent per stage in the last run.",
+               [("", self._labels(stage=name), seconds) for name, seconds in self.stages.items()])
+        metric("rows_written", "gauge", "Rows written per table in the last run.",
+               [("", self._labels(table=table), count) for table, count in self.rows.items()])
+        metric("bytes_written", "gauge", "Bytes sent per table in the last run.",
+               [("", self._labels(table=name), count) for name, count in self.bytes.items()])
+        metric("db_statements", "gauge", "Database round trips in the last run.",
+               [("", self._labels(), self.db_statements)])
+        metric("db_seconds", "gauge", "Time spent in database statements in the last run.",
+               [("", self._labels(), self.db_seconds)])
+        if self.http is not None:
+            with self.http.lock:
+                latencies = list(self.http.latencies)
+            samples = [
+                ("_bucket", self._labels(le=bound), sum(1 for l in latencies if l <= bound))
+                for bound in LATENCY_BUCKETS
+            ]
+            samples.append(("_bucket", self._labels(le="+Inf"), len(latencies)))
+            samples.append(("_sum", self._labels(), sum(latencies)))
+            samples.append(("_count", self._labels(), len(latencies)))
+            metric("http_request_seconds", "histogram", "HTTP request latency in the last run.", samples)
+            metric("http_retries", "gauge", "HTTP retries in the last run.",
+                   [("", self._labels(), self.http.retries)])
+            metric("http_received_bytes", "gauge", "HTTP response bytes in the last run.",
+                   [("", self._labels(), self.http.bytes)])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory):
+        """
+        Atomically (re)write <directory>/<prefix>_<pipeline>_<task>.prom.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{PREFIX}_{self.pipeline}_{self.task}.prom")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+    def statsd_lines(self):
+        prefix = f"{PREFIX}.{self.pipeline}.{self.task}"
+        lines = [f"{prefix}.stage.{name}:{seconds * 1000:.1f}|ms" for name, seconds in self.stages.items()]
+        lines += [f"{prefix}.rows.{table}:{count}|c" for table, count in self.rows.items()]
+        lines += [f"{prefix}.bytes.{name}:{count}|c" for name, count in self.bytes.items()]
+        lines += [f"{prefix}.db.statements:{self.db_statements}|c",
+                  f"{prefix}.db.time:{self.db_seconds * 1000:.1f}|ms"]
+        if self.http is not None:
+            with self.http.lock:
+                latencies = list(self.http.latencies)
+            lines += [f"{prefix}.http.request:{seconds * 1000:.1f}|ms" for seconds in latencies]
+            lines += [f"{prefix}.http.retries:{self.http.retries}|c"]
+        return lines
+
+    def send_statsd(self, host, port=STATSD_PORT):
+        """
+        Send the metrics over UDP, packing lines into datagrams of at most 512 bytes.
+        """
+        packets, packet = [], ""
+        for line in self.statsd_lines():
+            if packet and len(packet) + len(line) + 1 > 512:
+                packets.append(packet)
+                packet = ""
+            packet = f"{packet}\n{line}" if packet else line
+        if packet:
+            packets.append(packet)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for packet in packets:
+                sock.sendto(packet.encode(), (host, port))
+
+    def export(self, textfile_dir=TEXTFILE_DIR, statsd_host=STATSD_HOST):
+        """
+        Print the summary, write it to the configured outputs and return it.
+        A broken metrics sink never fails the run.
+        """
+        summary = self.summary()
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in summary["stages"].items())
+        print(f"📊 {self.pipeline}/{self.task}: {sum(self.rows.values())} rows, "
+              f"{self.db_statements} DB round trips, stages: {stages or 'none'}")
+        try:
+            if textfile_dir:
+                self.write_textfile(textfile_dir)
+            if statsd_host:
+                self.send_statsd(statsd_host)
+        except OSError as e:
+            print(f"Could not export metrics: {e}")
+        return summary
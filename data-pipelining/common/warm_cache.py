@@ -0,0 +1,127 @@
+"""
+Warm Superset's chart data cache after the dbt run.
+
+Logs in through the Superset REST API and re-runs every chart's saved query
+context through POST /api/v1/chart/data with force=true. That executes the
+query against the fresh marts and stores the result in DATA_CACHE_CONFIG
+(Redis), so the first dashboard viewer after a run gets cached results.
+
+Settings come from the environment: SUPERSET_URL, SUPERSET_USERNAME,
+SUPERSET_PASSWORD, SUPERSET_DASHBOARDS (comma-separated ids or slugs to warm;
+all charts when unset) and SUPERSET_WARM_WORKERS.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from http_client import HttpClient
+from metrics import RunMetrics
+
+SUPERSET_URL = os.getenv("SUPERSET_URL", "http://superset_app:8088").rstrip("/")
+SUPERSET_USERNAME = os.getenv("SUPERSET_USERNAME", "admin")
+SUPERSET_PASSWORD = os.getenv("SUPERSET_PASSWORD", "admin")
+DASHBOARDS = [d.strip() for d in os.getenv("SUPERSET_DASHBOARDS", "").split(",") if d.strip()]
+WARM_WORKERS = int(os.getenv("SUPERSET_WARM_WORKERS", "4"))
+
+def login(client, base_url=SUPERSET_URL, username=SUPERSET_USERNAME, password=SUPERSET_PASSWORD):
+    """
+    Authenticate the client's session: a JWT bearer token plus the CSRF token
+    Superset requires on POSTs.
+    """
+    response = client.post(f"{base_url}/api/v1/security/login", json={
+        "username": username, "password": password, "provider": "db", "refresh": False,
+    })
+    response.raise_for_status()
+    client.session.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    response = client.get(f"{base_url}/api/v1/security/csrf_token/")
+    response.raise_for_status()
+    client.session.headers["X-CSRFToken"] = response.json()["result"]
+    client.session.headers["Referer"] = base_url
+
+def list_charts(client, base_url=SUPERSET_URL, dashboards=DASHBOARDS):
+    """
+    (id, name) of the charts on the given dashboards, or of every chart.
+    """
+    charts = {}
+    if dashboards:
+        for dashboard in dashboards:
+            response = client.get(f"{base_url}/api/v1/dashboard/{dashboard}/charts")
+            response.raise_for_status()
+            for chart in response.json()["result"]:
+                charts[chart["id"]] = chart.get("slice_name")
+        return sorted(charts.items())
+
+    page = 0
+    while True:
+        query = f"(columns:!(id,slice_name),order_column:id,order_direction:asc,page:{page},page_size:100)"
+        response = client.get(f"{base_url}/api/v1/chart/", params={"q": query})
+        response.raise_for_status()
+        result = response.json()["result"]
+        if not result:
+            return sorted(charts.items())
+        for chart in result:
+            charts[chart["id"]] = chart.get("slice_name")
+        page += 1
+
+def warm_chart(client, chart_id, base_url=SUPERSET_URL):
+    """
+    Re-run one chart's saved query with force=true. Returns (status, rows).
+    """
+    response = client.get(f"{base_url}/api/v1/chart/{chart_id}")
+    response.raise_for_status()
+    query_context = response.json()["result"].get("query_context")
+    if not query_context:
+        # charts last saved before Superset stored query contexts; re-saving
+        # the chart in Explore fixes this
+        return "skipped (no saved query context)", 0
+    payload = json.loads(query_context)
+    payload["force"] = True
+    payload["result_type"] = "full"
+    payload["result_format"] = "json"
+    response = client.post(f"{base_url}/api/v1/chart/data", json=payload)
+    response.raise_for_status()
+    rows = sum(result.get("rowcount", 0) for result in response.json().get("result", []))
+    return "warmed", rows
+
+def warm_cache(pipeline, base_url=SUPERSET_URL, dashboards=DASHBOARDS, max_workers=WARM_WORKERS):
+    """
+    Warm every chart (of the given dashboards) and report the time per chart.
+    `pipeline` labels the run's metrics (e.g. "punkapi", "weather").
+    A failing chart is reported but does not fail the task; failing to log in does.
+    """
+    with RunMetrics(pipeline, "warm_cache") as metrics, HttpClient(pool_size=max_workers) as client:
+        metrics.record_http(client.metrics)
+        with metrics.stage("login"):
+            login(client, base_url)
+        with metrics.stage("list_charts"):
+            charts = list_charts(client, base_url, dashboards)
+        print(f"Warming {len(charts)} charts on {base_url} ...")
+
+        def warm(chart):
+            chart_id, name = chart
+            start = time.perf_counter()
+            try:
+                status, rows = warm_chart(client, chart_id, base_url)
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                status, rows = f"failed: {e}", 0
+            seconds = time.perf_counter() - start
+            print(f"🔥 chart {chart_id} ({name}): {status} in {seconds:.2f}s, {rows} rows")
+            return {"id": chart_id, "name": name, "status": status, "seconds": round(seconds, 3), "rows": rows}
+
+        with metrics.stage("warm"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(warm, charts))
+
+    warmed = [r for r in results if r["status"] == "warmed"]
+    failed = [r for r in results if r["status"].startswith("failed")]
+    for result in warmed:
+        metrics.add_stage(f"chart_{result['id']}", result["seconds"])
+    print(f"✅ Warmed {len(warmed)}/{len(results)} charts"
+          + (f", {len(failed)} failed" if failed else ""))
+    return {**metrics.export(), "charts": results}
+
+if __name__ == "__main__":
+    warm_cache(sys.argv[1] if len(sys.argv) > 1 else "superset")
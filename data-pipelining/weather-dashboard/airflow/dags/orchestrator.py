@@ -6,7 +6,9 @@ from datetime import datetime, timedelta
 from docker.types import Mount
 
 sys.path.append('/opt/airflow/api-request')
+sys.path.append('/opt/airflow/common')
 from insert_records import main
+from warm_cache import warm_cache
 
 default_args={
     'description': 'Orchestrating data',
@@ -21,6 +23,7 @@ dag = DAG(
 )
 
 with dag:
+    # returns the run's metrics summary, which is pushed to XCom
     task1 = PythonOperator(
         task_id='ingest_data_task',
         python_callable=main
@@ -43,4 +46,11 @@ with dag:
     )
     
     
-    task1 >> task2
\ No newline at end of file
+    # re-run the Superset chart queries so dashboards are served from a warm cache
+    task3 = PythonOperator(
+        task_id='warm_superset_cache_task',
+        python_callable=warm_cache,
+        op_kwargs={'pipeline': 'weather'}
+    )
+    
+    task1 >> task2 >> task3
@@ -1,18 +1,72 @@
-import requests 
+import os
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 
-api_key="3bdf224ceff7afbc9e071f47d42ab9c7"
-api_url= f"http://api.weatherstack.com/current?access_key={api_key}&query=Mumbai"
+from http_client import HttpClient
 
-def fetch_data():
+
+api_key = os.getenv("WEATHERSTACK_API_KEY", "3bdf224ceff7afbc9e071f47d42ab9c7")
+API_URL = "http://api.weatherstack.com/current"
+
+# Cities ingested per run, e.g. WEATHER_CITIES="Mumbai,Delhi,Pune"
+CITIES = [c.strip() for c in os.getenv("WEATHER_CITIES", "Mumbai").split(",") if c.strip()]
+MAX_WORKERS = int(os.getenv("WEATHER_MAX_WORKERS", "4"))
+# weatherstack request limit; keep this under the plan's allowance
+REQUESTS_PER_SECOND = float(os.getenv("WEATHER_REQUESTS_PER_SECOND", "5"))
+# locations per request; bulk queries ("A;B;C") need a paid weatherstack plan
+BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "1"))
+
+
+def _get_current(query, client):
+    response = client.get(API_URL, params={"access_key": api_key, "query": query})
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict) and "error" in data:
+        error = data["error"]
+        raise ValueError(f"weatherstack error {error.get('code')}: {error.get('info')}")
+    return data
+
+
+def fetch_data(city="Mumbai"):
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
+        with HttpClient(pool_size=1) as client:
+            data = _get_current(city, client)
         print("API Working")
-        print(response.json())
-        
-    
-    except requests.exceptions.RequestExeception as e:
+        return data
+
+    except requests.exceptions.RequestException as e:
         print(f"An Error Occured! {e}")
         raise
-        
+
+
+def fetch_cities(cities=CITIES, max_workers=MAX_WORKERS, batch_size=BATCH_SIZE,
+                 requests_per_second=REQUESTS_PER_SECOND, client=None):
+    """Fetch current weather for many cities concurrently, within the rate limit.
+
+    Returns one weatherstack payload per city that succeeded, in city order;
+    failed cities are reported and skipped so one bad name doesn't sink the run.
+    Pass a client to share its connections, rate limit and metrics with the caller.
+    """
+    batches = [cities[i:i + batch_size] for i in range(0, len(cities), batch_size)]
+    owned = client is None
+    if owned:
+        client = HttpClient(pool_size=max_workers, requests_per_second=requests_per_second)
+
+    def fetch_batch(batch):
+        try:
+            data = _get_current(";".join(batch), client)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"An Error Occured for {', '.join(batch)}! {e}")
+            return []
+        return data if isinstance(data, list) else [data]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = [data for batch in executor.map(fetch_batch, batches) for data in batch]
+    finally:
+        if owned:
+            client.close()
+    print(f"Fetched weather for {len(results)}/{len(cities)} cities")
+    print(f"HTTP: {client.metrics.summary()}")
+    return results
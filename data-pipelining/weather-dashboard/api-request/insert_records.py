@@ -1,52 +1,221 @@
+from datetime import date, datetime
+
 import psycopg2
-from api_request import fetch_data
+from psycopg2.extras import execute_values
+from api_request import CITIES, MAX_WORKERS, REQUESTS_PER_SECOND, fetch_cities
+from db_pool import checkin, checkout
+from http_client import HttpClient
+from metrics import RunMetrics
 
 def connect_db():
     print("Connecting to db ...")
     try:   
-        conn = psycopg2.connect(
-            host ="db",
-            port = 5432,
-            dbname= "db",
-            user = "db_user",
-            password= "db_password"
-        )
-        return conn
+        return checkout()
         
     except psycopg2.Error as e:
         print(f"connection failed: {e}")
         raise
 
+def _month_starts(times):
+    """First day of each month touched by the given local timestamps."""
+    months = set()
+    for value in times:
+        if isinstance(value, str):
+            value = datetime.strptime(value[:16], "%Y-%m-%d %H:%M")
+        months.add(date(value.year, value.month, 1))
+    return sorted(months)
+
+# months whose partition this process has created or seen committed; saves the
+# partition DDL on every insert (cleared on errors so the next attempt re-checks)
+_ensured_months = set()
+
+def ensure_partitions(cursor, times):
+    """Create the monthly partitions of dev.raw_weather_data that times fall into,
+    skipping months already ensured by this process. Returns the months it
+    handled; add them to _ensured_months once the transaction has committed."""
+    months = [start for start in _month_starts(times) if start not in _ensured_months]
+    statements = []
+    for start in months:
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        statements.append(f"""
+            CREATE TABLE IF NOT EXISTS dev.raw_weather_data_{start:%Y_%m}
+            PARTITION OF dev.raw_weather_data
+            FOR VALUES FROM ('{start}') TO ('{end}');
+        """)
+    if statements:
+        cursor.execute("".join(statements))
+    return months
+
+def _migrate_heap_table(cursor):
+    """Move rows from a pre-partitioning raw_weather_data heap into the partitioned table."""
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'dev' AND c.relname = 'raw_weather_data';
+    """)
+    kind = cursor.fetchone()
+    if not kind or kind[0] != 'r':
+        return False
+    print("Migrating dev.raw_weather_data to a partitioned table ...")
+    cursor.execute("""
+        ALTER TABLE dev.raw_weather_data RENAME TO raw_weather_data_heap;
+        ALTER INDEX IF EXISTS dev.raw_weather_data_pkey RENAME TO raw_weather_data_heap_pkey;
+        ALTER SEQUENCE IF EXISTS dev.raw_weather_data_id_seq RENAME TO raw_weather_data_heap_id_seq;
+    """)
+    return True
+
 def create_table(conn):
     print("Creating table....")
     try:
         cursor=conn.cursor()
+        migrate = _migrate_heap_table(cursor)
+        months = []
         cursor.execute(""" 
             CREATE SCHEMA IF NOT EXISTS dev;
             CREATE TABLE IF NOT EXISTS dev.raw_weather_data(
-                id SERIAL PRIMARY KEY,
-                city TEXT,
+                id SERIAL,
+                city TEXT NOT NULL,
                 temperature FLOAT,
                 weather_description TEXT,
                 wind_speed FLOAT,
-                time TIMESTAMP,
+                time TIMESTAMP NOT NULL,
                 inserted_at TIMESTAMP DEFAULT NOW(),
-                utc_offset TEXT
-            );           
+                utc_offset TEXT,
+                -- one observation per city and local time; also serves (city, time) lookups
+                PRIMARY KEY (city, time)
+            ) PARTITION BY RANGE (time);
+
+            -- per-city rollups for the dashboards, kept current by insert_many
+            CREATE TABLE IF NOT EXISTS dev.weather_hourly(
+                city TEXT NOT NULL,
+                hour TIMESTAMP NOT NULL,
+                observations INT NOT NULL,
+                min_temperature FLOAT,
+                max_temperature FLOAT,
+                avg_temperature FLOAT,
+                min_wind_speed FLOAT,
+                max_wind_speed FLOAT,
+                avg_wind_speed FLOAT,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (city, hour)
+            );
+            CREATE TABLE IF NOT EXISTS dev.weather_daily(
+                city TEXT NOT NULL,
+                date DATE NOT NULL,
+                observations INT NOT NULL,
+                min_temperature FLOAT,
+                max_temperature FLOAT,
+                avg_temperature FLOAT,
+                min_wind_speed FLOAT,
+                max_wind_speed FLOAT,
+                avg_wind_speed FLOAT,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (city, date)
+            );
             """)
+        if migrate:
+            cursor.execute("SELECT DISTINCT time FROM dev.raw_weather_data_heap WHERE time IS NOT NULL;")
+            months = ensure_partitions(cursor, [row[0] for row in cursor.fetchall()])
+            cursor.execute("""
+                INSERT INTO dev.raw_weather_data
+                SELECT id, city, temperature, weather_description, wind_speed, time, inserted_at, utc_offset
+                FROM dev.raw_weather_data_heap
+                WHERE city IS NOT NULL AND time IS NOT NULL
+                ORDER BY inserted_at
+                ON CONFLICT (city, time) DO NOTHING;
+                SELECT setval(pg_get_serial_sequence('dev.raw_weather_data', 'id'),
+                              COALESCE((SELECT MAX(id) FROM dev.raw_weather_data), 0) + 1, false);
+                DROP TABLE dev.raw_weather_data_heap;
+            """)
+        cursor.execute("""
+            SELECT EXISTS (SELECT 1 FROM dev.raw_weather_data)
+               AND NOT EXISTS (SELECT 1 FROM dev.weather_daily);
+        """)
+        if cursor.fetchone()[0]:
+            print("Backfilling weather rollups ...")
+            refresh_rollups(cursor)
         conn.commit()
+        _ensured_months.update(months)
         print("Table created...")
     except psycopg2.Error as e:
+        conn.rollback()
+        _ensured_months.clear()
         print(f"Failed to create table: {e}")
         raise
 
+# rollup table, its period column, and the date_trunc unit / type of that column
+ROLLUPS = [
+    ("weather_hourly", "hour", "hour", "timestamp"),
+    ("weather_daily", "date", "day", "date"),
+]
+
+def refresh_rollups(cursor, keys=None):
+    """Recompute the hourly and daily rollups of the periods touched by keys,
+    a list of (city, time) pairs, from raw_weather_data; every period when keys
+    is None. Periods are recomputed whole, so the rollups stay exact however
+    often a period receives new observations."""
+    for table, column, unit, kind in ROLLUPS:
+        if keys is None:
+            periods, params = "", None
+        else:
+            periods = f"""
+                JOIN (
+                    SELECT DISTINCT city, date_trunc('{unit}', t) AS period
+                    FROM unnest(%s::text[], %s::timestamp[]) AS k(city, t)
+                ) k ON r.city = k.city
+                   AND r.time >= k.period AND r.time < k.period + interval '1 {unit}'
+            """
+            params = ([city for city, _ in keys], [time for _, time in keys])
+        cursor.execute(f"""
+            INSERT INTO dev.{table} AS t (
+                city, {column}, observations,
+                min_temperature, max_temperature, avg_temperature,
+                min_wind_speed, max_wind_speed, avg_wind_speed, updated_at
+            )
+            SELECT
+                r.city, date_trunc('{unit}', r.time)::{kind}, count(*),
+                min(r.temperature), max(r.temperature), avg(r.temperature),
+                min(r.wind_speed), max(r.wind_speed), avg(r.wind_speed), NOW()
+            FROM dev.raw_weather_data r
+            {periods}
+            GROUP BY 1, 2
+            ON CONFLICT (city, {column}) DO UPDATE SET
+                observations = EXCLUDED.observations,
+                min_temperature = EXCLUDED.min_temperature,
+                max_temperature = EXCLUDED.max_temperature,
+                avg_temperature = EXCLUDED.avg_temperature,
+                min_wind_speed = EXCLUDED.min_wind_speed,
+                max_wind_speed = EXCLUDED.max_wind_speed,
+                avg_wind_speed = EXCLUDED.avg_wind_speed,
+                updated_at = EXCLUDED.updated_at;
+        """, params)
+
+def observation_row(data):
+    weather = data['current']
+    location = data['location']
+    return (
+        location['name'],
+        weather['temperature'],
+        weather['weather_descriptions'][0],
+        weather['wind_speed'],
+        location['localtime'],
+        location['utc_offset']
+    )
+
 def insert_records(conn,data):
-    print("Inserting values ...")
+    insert_many(conn, [data])
+
+def insert_many(conn, observations):
+    """Write all observations in one execute_values round trip, skipping ones already stored,
+    and refresh the rollups of the periods that received new rows.
+
+    Returns the number of rows actually inserted.
+    """
+    print(f"Inserting {len(observations)} observations ...")
     try: 
-        weather=data['current']
-        location = data['location']
         cursor = conn.cursor()
-        cursor.execute("""
+        rows = [observation_row(data) for data in observations]
+        months = ensure_partitions(cursor, [row[4] for row in rows])
+        inserted = execute_values(cursor, """
             INSERT INTO dev.raw_weather_data(
                 city,
                 temperature,
@@ -55,33 +224,54 @@ def insert_records(conn,data):
                 time,
                 inserted_at,
                 utc_offset
-            )VALUES(%s, %s, %s, %s, %s, NOW(), %s)
-            """,(
-            location['name'],
-            weather['temperature'],
-            weather['weather_descriptions'][0],
-            weather['wind_speed'],
-            location['localtime'],
-            location['utc_offset']
-            ))
+            ) VALUES %s
+            ON CONFLICT (city, time) DO NOTHING
+            RETURNING city, time
+            """,
+            rows,
+            template="(%s, %s, %s, %s, %s, NOW(), %s)",
+            page_size=1000,
+            fetch=True
+        )
+        if inserted:
+            refresh_rollups(cursor, inserted)
         conn.commit()
+        _ensured_months.update(months)
         print("data insertd !")
+        return len(inserted)
     except psycopg2.Error as e: 
+        _ensured_months.clear()
         print(f"Error inserting values: {e}")
         raise
     
     
-def main():
-    try: 
-        data = fetch_data()        
-        conn = connect_db()
-        create_table(conn)
-        insert_records(conn, data)    
-                
-    except Exception as e:
-        print(f"Error: {e}")
-    finally: 
-        if 'conn' in locals():
-            conn.close()
-            print("Database connection closed")
-main()q
\ No newline at end of file
+def main(cities=None):
+    """Fetch and store current weather for every city; returns the run's
+    metrics summary (Airflow pushes it to XCom)."""
+    with RunMetrics("weather") as metrics:
+        try: 
+            with HttpClient(pool_size=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND) as client:
+                metrics.record_http(client.metrics)
+                with metrics.stage("fetch"):
+                    observations = fetch_cities(cities or CITIES, client=client)
+            if not observations:
+                raise RuntimeError(f"No observations fetched for any of {len(cities or CITIES)} cities")
+            conn = connect_db()
+            with metrics.stage("create_table"):
+                create_table(conn)
+            with metrics.stage("load"):
+                metrics.add_rows("raw_weather_data", insert_many(conn, observations))
+                    
+        except Exception as e:
+            print(f"Error: {e}")
+            raise  # fail the Airflow task rather than report a failed load as success
+        finally: 
+            if 'conn' in locals():
+                print(f"{conn.statements} statements in {conn.statement_seconds:.2f}s")
+                checkin(conn)
+                print("Database connection returned to pool")
+            summary = metrics.export()
+    return summary
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,14 @@
     materialized='table'
 )}}
 
+-- reads the per-city daily rollup kept current by ingest, so the cost of
+-- this model no longer grows with the raw observation history
 select
     city,
-    date(weather_time_local) as date,
-    round(avg(temperature)::numeric,2) as avg_temperature,
-    round(avg(wind_speed)::numeric,2) as avg_wind_speed
-from{{ref('staging')}}
-group by
-    city,
-    date(weather_time_local)
+    date,
+    round(avg_temperature::numeric,2) as avg_temperature,
+    round(avg_wind_speed::numeric,2) as avg_wind_speed
+from{{ source('dev','weather_daily') }}
 order by
     city,
-    date(weather_time_local)
+    date
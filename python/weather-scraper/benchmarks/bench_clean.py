@@ -0,0 +1,125 @@
+"""
+Time the historic table cleanup over a multi-month range of days.
+
+    python benchmarks/bench_clean.py
+    python benchmarks/bench_clean.py --days 365
+
+Each day is the fixture page's raw table (as read_html returns it, ad footer
+row included). A month-long fetch_date_range_weather cleans one such table
+per day, so the cost here is paid hundreds of times for long ranges.
+
+Cleanups:
+  legacy      the original row-wise version (df.apply(..., axis=1) per row)
+  columnar    _clean_historic_frame, as used by fetch_historic_weather (which
+              also parses the readings into typed columns)
+
+Both outputs are checked to hold the same observations before timing.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from scraper import _clean_historic_frame, _looks_like_no_data, _read_table_bs4  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "historic_day.html")
+
+
+def legacy_looks_like_no_data(df):
+    if df is None or df.empty:
+        return True
+    txt = df.astype(str)
+    return txt.apply(lambda s: s.str.contains("No data available", case=False)).any().any()
+
+
+def legacy_clean(df):
+    """
+    The cleanup fetch_historic_weather did before it went columnar.
+    """
+    rename_map = {
+        "Unnamed: 0_level_0_Time": "Time",
+        "Time": "Time",
+        "Conditions_Temp": "Temperature",
+        "Conditions_Weather": "Weather",
+        "Conditions_Wind": "Wind",
+        "Conditions": "Weather",
+        "Comfort_Humidity": "Humidity",
+        "Comfort_Barometer": "Barometer",
+        "Comfort_Visibility": "Visibility",
+    }
+    df = df.rename(columns=rename_map)
+    if "Time" not in df.columns:
+        time_like = [c for c in df.columns if "Time" in c]
+        if time_like:
+            df = df.rename(columns={time_like[0]: "Time"})
+    df = df[~df.apply(lambda row: row.astype(str).str.contains("CustomWeather", case=False).any(), axis=1)]
+    if ("Temperature" not in df.columns) and ("Weather" in df.columns):
+        df["Temperature"] = df["Weather"].str.extract(r"(-?\d+)\s*°\s*C", flags=re.IGNORECASE)[0]
+        df["Weather"] = (
+            df["Weather"]
+            .str.replace(r"-?\d+\s*°\s*C", "", regex=True, flags=re.IGNORECASE)
+            .str.strip(" .")
+        )
+    wanted = ["Time", "Temperature", "Weather", "Wind", "Humidity", "Barometer", "Visibility"]
+    df = df[[c for c in wanted if c in df.columns]].copy()
+    if "Time" in df.columns:
+        df["Time_clean"] = df["Time"].astype(str).str.extract(r"(\d{1,2}[:.]\d{2})")[0]
+        df["Time_clean"] = df["Time_clean"].str.replace(".", ":", regex=False)
+        df["Time_parsed"] = pd.to_datetime(df["Time_clean"], format="%H:%M", errors="coerce").dt.time
+        df = df.dropna(subset=["Time_parsed"])
+        df["Time"] = df["Time_parsed"].astype(str).str[:5]
+        df = df.sort_values("Time_parsed").reset_index(drop=True)
+    return df
+
+
+def check_same(legacy, columnar):
+    """
+    Assert the legacy text frame and the typed frame hold the same observations.
+    """
+    assert list(legacy.columns) == list(columnar.columns), (list(legacy.columns), list(columnar.columns))
+    for column in legacy.columns:
+        if str(columnar[column].dtype) == "float32":
+            expected = pd.to_numeric(legacy[column].str.extract(r"(-?\d+)", expand=False)).astype("float32")
+            pd.testing.assert_series_equal(expected, columnar[column])
+        else:
+            pd.testing.assert_series_equal(legacy[column], columnar[column].astype(legacy[column].dtype))
+
+
+def run(check, clean, days):
+    """
+    Check and clean one raw table per day; returns seconds and the last frame.
+    """
+    start = time.perf_counter()
+    for raw in days:
+        if not check(raw):
+            df = clean(raw)
+    return time.perf_counter() - start, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=90, help="days in the range")
+    parser.add_argument("--page", default=FIXTURE, help="HTML page whose table is used for every day")
+    args = parser.parse_args()
+
+    with open(args.page, encoding="utf-8") as f:
+        raw = _read_table_bs4(f.read())
+    days = [raw.copy() for _ in range(args.days)]
+    check_same(legacy_clean(raw), _clean_historic_frame(raw))
+    print(f"days={args.days} rows/day={len(raw)}\n")
+
+    results = {}
+    for name, check, clean in [("legacy", legacy_looks_like_no_data, legacy_clean),
+                               ("columnar", _looks_like_no_data, _clean_historic_frame)]:
+        seconds, df = run(check, clean, days)
+        results[name] = seconds
+        print(f"{name:<9} {seconds:>8.3f}s {seconds / args.days * 1000:>8.2f} ms/day   {len(df)} rows/day out")
+    print(f"\ncolumnar is {results['legacy'] / results['columnar']:.1f}x faster than legacy")
+
+
+if __name__ == "__main__":
+    main()
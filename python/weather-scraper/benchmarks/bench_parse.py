@@ -0,0 +1,62 @@
+"""
+Time the per-page cost of extracting the historic weather table.
+
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --page saved_page.html --repeat 500
+
+fixtures/historic_day.html mirrors the layout of a timeanddate.com historic
+page (48 half-hourly observations inside the usual page chrome). Save a real
+page with "curl -A Mozilla ... > page.html" and pass --page to time that.
+
+Parsers:
+  bs4     BeautifulSoup(html.parser) to find the table, then pd.read_html on str(table)
+  lxml    single lxml pass over the page (_read_table_lxml)
+  auto    _read_historic_table: lxml with the bs4 fallback, as used by fetch_historic_weather
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from scraper import _read_historic_table, _read_table_bs4, _read_table_lxml  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "historic_day.html")
+PARSERS = {"bs4": _read_table_bs4, "lxml": _read_table_lxml, "auto": _read_historic_table}
+
+
+def bench(parse, page, repeat):
+    """
+    Best-of-three mean seconds per page.
+    """
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            df = parse(page)
+        seconds = (time.perf_counter() - start) / repeat
+        best = seconds if best is None else min(best, seconds)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page", default=FIXTURE, help="HTML page to parse")
+    parser.add_argument("--repeat", type=int, default=100, help="parses per timing round")
+    args = parser.parse_args()
+
+    with open(args.page, encoding="utf-8") as f:
+        page = f.read()
+    print(f"page={os.path.basename(args.page)} ({len(page.encode()) / 1024:.0f} KiB) repeat={args.repeat}\n")
+
+    results = {}
+    for name, parse in PARSERS.items():
+        seconds, df = bench(parse, page, args.repeat)
+        results[name] = seconds
+        shape = "no table" if df is None else f"{df.shape[0]} rows x {df.shape[1]} cols"
+        print(f"{name:<6} {seconds * 1000:>8.2f} ms/page {1 / seconds:>8.0f} pages/s   {shape}")
+    print(f"\nlxml is {results['bs4'] / results['lxml']:.1f}x faster than bs4 + read_html")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Time picking the observations nearest to target times over a date range.
+
+    python benchmarks/bench_sample.py
+    python benchmarks/bench_sample.py --days 365 --times hourly
+
+Every day is the fixture page's cleaned table, with the observation times
+jittered per day so ties and gaps are exercised.
+
+Samplers:
+  legacy    per day and target: re-parse Time, argsort the differences, copy the row
+  asof      sample_nearest_times: one merge_asof over all days, by Date
+
+Both outputs are checked to be identical before timing.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from config import DEFAULT_TARGET_TIMES  # noqa: E402
+from scraper import _apply_dtypes, _clean_historic_frame, _read_table_lxml, sample_nearest_times  # noqa: E402
+from utils import parse_target_times  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "historic_day.html")
+
+
+def legacy_sample(days, target_times):
+    """
+    The sampling loop fetch_date_range_weather ran before the as-of join.
+    """
+    all_data = []
+    for date, df in days:
+        for target_time in target_times:
+            closest_row = df.iloc[(pd.to_datetime(df["Time"], format="%H:%M", errors="coerce") -
+                                   pd.to_datetime(target_time, format="%H:%M")).abs().argsort(kind="stable")[:1]]
+            if not closest_row.empty:
+                row_data = closest_row.iloc[0].copy()
+                row_data["Date"] = date
+                row_data["Target_Time"] = target_time
+                all_data.append(row_data)
+    result = pd.DataFrame(all_data).reset_index(drop=True)
+    cols = ["Date", "Target_Time", "Time"] + [c for c in result.columns if c not in ["Date", "Target_Time", "Time"]]
+    return _apply_dtypes(result[cols])
+
+
+def make_days(count, seed=0):
+    """
+    `count` cleaned days whose observation times are shifted by up to +-20 minutes.
+    """
+    with open(FIXTURE, encoding="utf-8") as f:
+        raw = _read_table_lxml(f.read())
+    rnd = random.Random(seed)
+    start = pd.Timestamp("2025-01-01")
+    days = []
+    for i in range(count):
+        day = raw.copy()
+        minutes = [max(0, min(1439, 30 * j + rnd.randint(-20, 20))) for j in range(len(day))]
+        day.iloc[:, 0] = [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+        date = start + pd.Timedelta(days=i)
+        days.append((date.strftime("%Y-%m-%d"), _clean_historic_frame(day, date.strftime("%Y%m%d"))))
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=90, help="days in the range")
+    parser.add_argument("--times", default=",".join(DEFAULT_TARGET_TIMES), help='target times or "hourly"')
+    args = parser.parse_args()
+
+    target_times = parse_target_times(args.times)
+    days = make_days(args.days)
+    pd.testing.assert_frame_equal(legacy_sample(days, target_times), sample_nearest_times(days, target_times))
+    print(f"days={args.days} target_times={len(target_times)}\n")
+
+    results = {}
+    for name, sample in [("legacy", legacy_sample), ("asof", sample_nearest_times)]:
+        start = time.perf_counter()
+        df = sample(days, target_times)
+        results[name] = time.perf_counter() - start
+        print(f"{name:<7} {results[name]:>8.3f}s   {len(df)} rows out")
+    print(f"\nasof is {results['legacy'] / results['asof']:.0f}x faster than legacy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Time city search over a large merged catalogue of place names.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --cities 1000000 --repeat 200
+
+The catalogue is synthetic: slug-style names ("new-rampur", "kalyanagar")
+built from Indian place-name syllables, sized like an all-countries list.
+
+Searches:
+  legacy    the original linear scan ([c for c in cities if query in c.lower()])
+  index     CityIndex.search: bisect prefix lookup, trigram postings for
+            substring matches; when nothing matches, one-edit variants of
+            the query looked up with bisect, then trigram-ranked candidates
+            checked with a bounded edit distance
+
+Typo queries only show up for the index; the linear scan finds nothing.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from city_index import CityIndex  # noqa: E402
+
+SYLLABLES = ["ra", "ma", "pur", "na", "ga", "bad", "ka", "li", "an", "dh", "sh", "ti", "ko", "la", "va",
+             "nag", "ar", "gu", "de", "hi", "ban", "jal", "sa", "ri", "ch", "am", "bi", "kot", "ul", "wa"]
+PREFIXES = ["new", "old", "north", "south", "east", "west", "upper", "lower"]
+
+
+def make_catalogue(count, seed=0):
+    """
+    `count` distinct slug-style place names.
+    """
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        name = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 5)))
+        if rnd.random() < 0.15:
+            name = f"{rnd.choice(PREFIXES)}-{name}"
+        names.add(name)
+    return sorted(names)
+
+
+def typo(name, rnd):
+    """
+    The name with one character replaced.
+    """
+    i = rnd.randrange(len(name))
+    return name[:i] + rnd.choice("aeioukrst".replace(name[i], "")) + name[i + 1:]
+
+
+def bench(search, queries, repeat):
+    """
+    Mean seconds per query and the matches of the last query.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            matches = search(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)), matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=300_000, help="names in the catalogue")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the query set")
+    args = parser.parse_args()
+
+    cities = make_catalogue(args.cities)
+    rnd = random.Random(1)
+    picks = rnd.sample(cities, 20)
+    queries = {
+        "prefix": [name[:4] for name in picks],
+        "substring": [name[2:8] for name in picks],
+        "typo": [typo(name, rnd) for name in picks],
+    }
+
+    start = time.perf_counter()
+    index = CityIndex(cities)
+    build = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cities.index.pkl")
+        index.save(path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        index = CityIndex.load(path)
+        load = time.perf_counter() - start
+    print(f"cities={len(cities)} build={build:.2f}s load={load:.2f}s index={size / 1024 / 1024:.1f} MiB\n")
+
+    legacy = lambda query: [c for c in cities if query.lower() in c.lower()]  # noqa: E731
+    for kind, batch in queries.items():
+        found = sum(bool(index.search(query)) for query in batch)
+        line = f"{kind:<10} {found:>2}/{len(batch)} found"
+        timings = {}
+        for name, search, repeat in [("legacy", legacy, 1), ("index", index.search, args.repeat)]:
+            timings[name], _ = bench(search, batch, repeat)
+            line += f"   {name} {timings[name] * 1000:>8.3f} ms/query"
+        print(f"{line}   ({timings['legacy'] / timings['index']:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Persistent on-disk cache of historic weather tables."""
+
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import pendulum
+from config import DATA_DIR, CACHE_FILE, CACHE_MAX_BYTES, CACHE_RECENT_TTL, CACHE_VERSION
+
+
+class HistoricCache:
+    """SQLite-backed cache of historic DataFrames, one row per country/city/day.
+
+    Finished days never expire. Today and yesterday (the city may be in a
+    timezone that is still living it) are refetched after `recent_ttl` seconds.
+    When the cache grows beyond `max_bytes`, the least recently used days are
+    evicted. A cache written with another CACHE_VERSION is dropped on open.
+
+    Hits don't write: their access times are kept in memory and written in
+    one batch on the next put (before eviction), every `touch_batch` hits,
+    or on close.
+    """
+
+    touch_batch = 256
+
+    def __init__(self, path=os.path.join(DATA_DIR, CACHE_FILE), max_bytes=CACHE_MAX_BYTES, recent_ttl=CACHE_RECENT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent_ttl = recent_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        self.touched = {}
+        atexit.register(self.close)
+
+    def _connect(self):
+        """Open the database on first use."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                self.conn.execute("DROP TABLE IF EXISTS historic")
+                self.conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS historic (
+                    country TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (country, city, date)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS historic_accessed_at ON historic (accessed_at)")
+            self.conn.commit()
+        return self.conn
+
+    def _flush_touches(self, conn):
+        """Write the pending hit access times (the caller commits)."""
+        if self.touched:
+            conn.executemany(
+                "UPDATE historic SET accessed_at = ? WHERE country = ? AND city = ? AND date = ?",
+                [(accessed_at, *key) for key, accessed_at in self.touched.items()],
+            )
+            self.touched.clear()
+
+    def is_recent(self, date_str):
+        """True for days that may still get new observations."""
+        return date_str >= pendulum.today().subtract(days=1).format("YYYYMMDD")
+
+    def get(self, country, city, date_str):
+        """Return the cached DataFrame for a day, or None on a miss or expiry."""
+        key = (country, city, date_str)
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT fetched_at, data FROM historic WHERE country = ? AND city = ? AND date = ?", key
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.is_recent(date_str) and now - row[0] > self.recent_ttl):
+                self.misses += 1
+                return None
+            self.touched[key] = now
+            if len(self.touched) >= self.touch_batch:
+                self._flush_touches(conn)
+                conn.commit()
+            self.hits += 1
+        return pickle.loads(row[1])
+
+    def put(self, country, city, date_str, df):
+        """Store a day's DataFrame, then evict least recently used days over the size limit."""
+        data = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO historic VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (country, city, date_str, now, now, len(data), data),
+            )
+            self.touched.pop((country, city, date_str), None)
+            self._flush_touches(conn)
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM historic").fetchone()[0]
+            if total > self.max_bytes:
+                for rowid, size in conn.execute("SELECT rowid, size FROM historic ORDER BY accessed_at").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM historic WHERE rowid = ?", (rowid,))
+                    total -= size
+                    self.evictions += 1
+            conn.commit()
+
+    def clear(self):
+        """Drop every cached day."""
+        with self.lock:
+            conn = self._connect()
+            self.touched.clear()
+            conn.execute("DELETE FROM historic")
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def close(self):
+        """Write pending access times and close the database."""
+        with self.lock:
+            if self.conn is not None:
+                self._flush_touches(self.conn)
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def stats(self):
+        """Hit/miss counters of this process plus the cache's size on disk."""
+        with self.lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM historic"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+historic_cache = HistoricCache()
\ No newline at end of file
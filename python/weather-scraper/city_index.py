@@ -0,0 +1,231 @@
+"""Prebuilt city name index for fast prefix, substring and typo-tolerant search."""
+
+import bisect
+import hashlib
+import os
+import pickle
+import unicodedata
+import numpy as np
+from config import DATA_DIR, CITY_INDEX_FILE_TEMPLATE, CITY_SEARCH_LIMIT
+
+INDEX_VERSION = 2
+FUZZY_CANDIDATES = 64  # names with the most shared trigrams that get an edit distance check
+
+
+def normalize(name):
+    """Lower-case, strip accents and turn "-"/"_" separators into spaces."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.lower().replace("-", " ").replace("_", " ").split())
+
+
+def trigrams(key, padded=False):
+    """Distinct 3-character substrings of a key; padding adds word-boundary grams."""
+    if padded:
+        key = f"  {key} "
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def prefix_distance(query, name):
+    """Smallest edit distance between query and any prefix of name.
+
+    Bit-parallel (Myers 1999): one pass over name, a few integer operations
+    per character, with the distance to each prefix read off as it goes.
+    """
+    if not query:
+        return 0
+    masks = {}
+    for i, c in enumerate(query):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    full = (1 << len(query)) - 1
+    last = 1 << (len(query) - 1)
+    pv, mv, score = full, 0, len(query)
+    best = score
+    for c in name:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+            best = min(best, score)
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return best
+
+
+class CityIndex:
+    """Search index over a list of city names.
+
+    Holds the normalised names sorted for bisect prefix lookups and an
+    inverted trigram index (trigram -> sorted name ids) for substring and
+    fuzzy lookups. Results are ranked: exact, prefix, substring, then names
+    within a small edit distance of the query. Queries shorter than a
+    trigram fall back to a scan of the names.
+    """
+
+    def __init__(self, cities):
+        self.names = list(cities)
+        self.keys = [normalize(name) for name in self.names]
+        self.lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+        self.order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.sorted_keys = [self.keys[i] for i in self.order]
+        self.alphabet = sorted(set("".join(self.keys)))
+        self.signature = self.make_signature(self.names)
+
+        postings = {}
+        for i, key in enumerate(self.keys):
+            for gram in trigrams(key, padded=True):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @staticmethod
+    def make_signature(cities):
+        """Digest of a city list, used to tell whether a saved index is stale."""
+        return hashlib.sha1("\n".join(cities).encode()).hexdigest()
+
+    def _prefix(self, query):
+        """Ids of names starting with query, in name order."""
+        lo = bisect.bisect_left(self.sorted_keys, query)
+        hi = bisect.bisect_left(self.sorted_keys, query + "\uffff")
+        return self.order[lo:hi]
+
+    def _substring(self, query, exclude, limit):
+        """Ids of names containing query (up to `limit`, None for all), shortest names first.
+
+        Queries shorter than a trigram have no postings of their own, so their
+        names are scanned instead.
+        """
+        if len(query) < 3:
+            return [i for i, key in enumerate(self.keys) if query in key and i not in exclude]
+        grams = [self.postings.get(gram) for gram in trigrams(query)]
+        if any(ids is None for ids in grams):
+            return []
+        grams.sort(key=len)
+        candidates = grams[0]
+        for ids in grams[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return []
+        candidates = candidates[np.argsort(self.lengths[candidates], kind="stable")]
+        found = []
+        for i in candidates.tolist():
+            if i not in exclude and query in self.keys[i]:
+                found.append(i)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def _one_edit(self, query, limit):
+        """Ids of names whose prefix is one edit away from query, shortest first.
+
+        Each deletion, transposition, substitution or insertion of query is
+        looked up as a prefix with bisect. Edits at position i keep query[:i],
+        so their lookups stay inside the range of names starting with it, and
+        the walk stops at the first position no name shares.
+        """
+        keys = self.sorted_keys
+        lo, hi = 0, len(keys)
+        found = set()
+        for i in range(len(query) + 1):
+            head, tail = query[:i], query[i:]
+            variants = {head + c + tail for c in self.alphabet}
+            if tail:
+                variants.add(head + tail[1:])
+                variants.update(head + c + tail[1:] for c in self.alphabet if c != tail[0])
+            if len(tail) > 1:
+                variants.add(head + tail[1] + tail[0] + tail[2:])
+            for variant in variants:
+                start = bisect.bisect_left(keys, variant, lo, hi)
+                if start < hi and keys[start].startswith(variant):
+                    found.update(self.order[start:bisect.bisect_left(keys, variant + "\uffff", start, hi)])
+            if not tail:
+                break
+            lo = bisect.bisect_left(keys, head + tail[0], lo, hi)
+            hi = bisect.bisect_left(keys, head + tail[0] + "\uffff", lo, hi)
+            if lo == hi:
+                break
+        return sorted(found, key=lambda i: (self.lengths[i], self.keys[i]))[:limit]
+
+    def _fuzzy(self, query, limit):
+        """Ids of names within a small edit distance of query (or of their prefix), closest first."""
+        grams = [self.postings[gram] for gram in trigrams(query, padded=True) if gram in self.postings]
+        if not grams:
+            return []
+        max_distance = 1 if len(query) <= 4 else 2
+        # each edit breaks at most 3 trigrams, and a prefix match loses the trailing " " gram
+        need = max(1, len(trigrams(query, padded=True)) - 1 - 3 * max_distance)
+        shared = np.bincount(np.concatenate(grams), minlength=len(self.keys))
+        ids = np.flatnonzero(shared >= need)
+        if len(ids) > FUZZY_CANDIDATES:
+            ids = ids[np.argpartition(shared[ids], -FUZZY_CANDIDATES)[-FUZZY_CANDIDATES:]]
+        scored = []
+        for i in ids.tolist():
+            key = self.keys[i]
+            distance = prefix_distance(query, key)
+            if distance <= max_distance:
+                scored.append((distance, len(key), key, i))
+        scored.sort()
+        return [i for *_, i in scored][:limit]
+
+    def search(self, query, limit=CITY_SEARCH_LIMIT):
+        """Names matching query, best first; typo-tolerant when nothing matches literally.
+
+        At most `limit` names are returned; pass None for every match.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        prefix = self._prefix(query)
+        ranked = prefix if limit is None else prefix[:limit * 4]
+        ranked = sorted(ranked, key=lambda i: (self.keys[i] != query, self.lengths[i], self.keys[i]))[:limit]
+        if limit is None or len(ranked) < limit:
+            substring = self._substring(query, set(prefix), None if limit is None else limit - len(ranked))
+            # names where the query starts a word rank above mid-word matches
+            substring.sort(key=lambda i: (f" {query}" not in self.keys[i], self.lengths[i], self.keys[i]))
+            ranked += substring
+        if not ranked and len(query) >= 3:
+            ranked = self._one_edit(query, limit)
+            if not ranked and len(query) > 4:
+                ranked = self._fuzzy(query, limit)
+        return [self.names[i] for i in ranked]
+
+    def save(self, path):
+        """Write the index to path (atomically)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((INDEX_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(); None if missing or from another version."""
+        try:
+            with open(path, "rb") as f:
+                version, state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != INDEX_VERSION:
+            return None
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+
+def load_city_index(country, cities):
+    """The index for a country's city list, rebuilt and saved next to its JSON cache when stale."""
+    path = os.path.join(DATA_DIR, CITY_INDEX_FILE_TEMPLATE.format(country))
+    index = CityIndex.load(path)
+    if index is None or index.signature != CityIndex.make_signature(cities):
+        index = CityIndex(cities)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+    return index
\ No newline at end of file
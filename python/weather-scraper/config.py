@@ -4,6 +4,7 @@ import os
 
 # File templates
 CITIES_FILE_TEMPLATE = "{}_cities.json"
+CITY_INDEX_FILE_TEMPLATE = "{}_cities.index.pkl"  # search index saved next to the city list
 
 # URLs
 BASE_URL = "https://www.timeanddate.com/weather"
@@ -15,6 +16,34 @@ HISTORIC_URL_TEMPLATE = "https://www.timeanddate.com/weather/{}/{}/historic?hd={
 REQUEST_TIMEOUT = 20
 REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 
+# Concurrent date range fetching
+FETCH_WORKERS = 8  # parallel historic page requests
+REQUESTS_PER_SECOND = 4  # per host, to stay polite to timeanddate.com
+DEFAULT_TARGET_TIMES = ["06:00", "12:00", "18:00", "00:00"]  # sampled per day; "hourly" is also accepted
+
+# Historic weather cache (SQLite file in DATA_DIR)
+CACHE_FILE = "historic_cache.sqlite"
+CACHE_VERSION = 2  # bump when the cached DataFrame layout changes
+CACHE_MAX_BYTES = 100 * 1024 * 1024  # least recently used days are evicted beyond this
+CACHE_RECENT_TTL = 15 * 60  # seconds before today's (and yesterday's) data is refetched
+
+# Units of the typed historic weather columns (imperial readings are converted)
+TEMPERATURE_UNIT = "°C"
+WIND_UNIT = "km/h"
+HUMIDITY_UNIT = "%"
+PRESSURE_UNIT = "mbar"
+VISIBILITY_UNIT = "km"
+COLUMN_UNITS = {
+    "Temperature": TEMPERATURE_UNIT,
+    "Wind": WIND_UNIT,
+    "Humidity": HUMIDITY_UNIT,
+    "Barometer": PRESSURE_UNIT,
+    "Visibility": VISIBILITY_UNIT,
+}
+
+# City search
+CITY_SEARCH_LIMIT = 50  # most matches shown per search
+
 # File settings
 DATA_DIR = "weather_data"
 DEFAULT_COUNTRY = "india"
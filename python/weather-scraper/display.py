@@ -7,7 +7,8 @@ from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
-from utils import extract_numeric_temperature, extract_numeric_humidity, calculate_statistics
+from config import COLUMN_UNITS, TEMPERATURE_UNIT, HUMIDITY_UNIT
+from utils import extract_numeric_temperature, calculate_statistics, numeric_column
 
 console = Console()
 
@@ -35,6 +36,17 @@ def display_weather_table(data, title="🌤️ Today's Weather"):
     console.print(table)
 
 
+def format_reading(column, value):
+    """Render a table cell, re-adding the unit that typed reading columns leave out."""
+    unit = COLUMN_UNITS.get(column)
+    if unit is None or isinstance(value, str):
+        return str(value)
+    if pd.isna(value):
+        return "N/A"
+    number = f"{round(float(value), 1):g}"
+    return f"{number}{unit}" if unit == "%" else f"{number} {unit}"
+
+
 def display_rich_table(df: pd.DataFrame, title="🌦️ Weather Data"):
     """Display DataFrame in a rich table format."""
     if df is None or df.empty:
@@ -66,7 +78,7 @@ def display_rich_table(df: pd.DataFrame, title="🌦️ Weather Data"):
     for _, row in df.iterrows():
         values = []
         for c in cols:
-            value = str(row.get(c, ""))
+            value = format_reading(c, row.get(c, ""))
             # Truncate long values
             if len(value) > 20:
                 value = value[:17] + "..."
@@ -89,9 +101,9 @@ def show_statistics(df: pd.DataFrame, title="📊 Weather Statistics"):
         temp_stats = stats["temperature"]
         lines += [
             f"🌡️ Temperature Statistics:",
-            f"   • Average: {temp_stats['avg']:.1f}°C",
-            f"   • Minimum: {temp_stats['min']:.1f}°C",
-            f"   • Maximum: {temp_stats['max']:.1f}°C",
+            f"   • Average: {temp_stats['avg']:.1f}{TEMPERATURE_UNIT}",
+            f"   • Minimum: {temp_stats['min']:.1f}{TEMPERATURE_UNIT}",
+            f"   • Maximum: {temp_stats['max']:.1f}{TEMPERATURE_UNIT}",
             f"   • Data Points: {temp_stats['count']}",
             ""
         ]
@@ -100,9 +112,9 @@ def show_statistics(df: pd.DataFrame, title="📊 Weather Statistics"):
         hum_stats = stats["humidity"]
         lines += [
             f"💧 Humidity Statistics:",
-            f"   • Average: {hum_stats['avg']:.1f}%",
-            f"   • Minimum: {hum_stats['min']:.1f}%",
-            f"   • Maximum: {hum_stats['max']:.1f}%",
+            f"   • Average: {hum_stats['avg']:.1f}{HUMIDITY_UNIT}",
+            f"   • Minimum: {hum_stats['min']:.1f}{HUMIDITY_UNIT}",
+            f"   • Maximum: {hum_stats['max']:.1f}{HUMIDITY_UNIT}",
             f"   • Data Points: {hum_stats['count']}",
             ""
         ]
@@ -133,23 +145,19 @@ def display_scatter_plot(df: pd.DataFrame, title="📈 24-Hour Temperature Plot"
         return
 
     # Extract temperature and time data
-    temps = df["Temperature"].apply(extract_numeric_temperature).dropna()
+    temps = numeric_column(df, "Temperature", extract_numeric_temperature)
     if temps.empty:
         console.print("[bold red]❌ No temperature data available for plotting.[/]")
         return
 
     # Extract hour from time
-    hours = []
-    for idx in temps.index:
-        if "Time" in df.columns:
-            time_str = str(df.loc[idx, "Time"])
-            try:
-                hour = int(time_str.split(":")[0])
-                hours.append(hour)
-            except:
-                hours.append(0)
-        else:
-            hours.append(0)
+    if "Time" in df.columns:
+        hours = (
+            pd.to_numeric(df.loc[temps.index, "Time"].astype(str).str.split(":").str[0], errors="coerce")
+            .fillna(0).astype(int).tolist()
+        )
+    else:
+        hours = [0] * len(temps)
 
     if not hours:
         console.print("[bold red]❌ No time data available for plotting.[/]")
@@ -159,14 +167,14 @@ def display_scatter_plot(df: pd.DataFrame, title="📈 24-Hour Temperature Plot"
     try:
         # Convert to int arrays
         x_data = np.array(hours, dtype=int)
-        y_data = np.array(temps.values, dtype=int)
+        y_data = np.rint(temps.to_numpy(dtype=float)).astype(int)
         
         # Create scatter plot
         plot = plotille.scatter(
             x_data, y_data,
             width=80, height=20,
             X_label="Hour (0-23)",
-            Y_label="Temperature (°C)"
+            Y_label=f"Temperature ({TEMPERATURE_UNIT})"
         )
         
         console.print(Panel(plot, title=title, border_style="green"))
@@ -174,10 +182,10 @@ def display_scatter_plot(df: pd.DataFrame, title="📈 24-Hour Temperature Plot"
         # Show analysis
         analysis_lines = [
             f"📊 Temperature Analysis (24 Hours):",
-            f"   • Minimum Temperature: {int(y_data.min())}°C at {x_data[np.argmin(y_data)]:02d}:00",
-            f"   • Maximum Temperature: {int(y_data.max())}°C at {x_data[np.argmax(y_data)]:02d}:00",
-            f"   • Average Temperature: {int(y_data.mean())}°C",
-            f"   • Temperature Range: {int(y_data.max() - y_data.min())}°C",
+            f"   • Minimum Temperature: {int(y_data.min())}{TEMPERATURE_UNIT} at {x_data[np.argmin(y_data)]:02d}:00",
+            f"   • Maximum Temperature: {int(y_data.max())}{TEMPERATURE_UNIT} at {x_data[np.argmax(y_data)]:02d}:00",
+            f"   • Average Temperature: {int(y_data.mean())}{TEMPERATURE_UNIT}",
+            f"   • Temperature Range: {int(y_data.max() - y_data.min())}{TEMPERATURE_UNIT}",
             f"   • Data Points: {len(y_data)}"
         ]
         
@@ -195,7 +203,7 @@ def display_menu():
 
 [bold cyan]1.[/bold cyan] 🌤️  Display Today's Weather
 [bold cyan]2.[/bold cyan] 📅  Display Historic Weather (Specific Date)
-[bold cyan]3.[/bold cyan] 📊  Display Weather Range (6AM, 12PM, 6PM, 12AM)
+[bold cyan]3.[/bold cyan] 📊  Display Weather Range (6AM, 12PM, 6PM, 12AM or custom times)
 [bold cyan]4.[/bold cyan] 📈  Display Last 24 Hours Plot
 [bold cyan]5.[/bold cyan] 💾  Save Data Options
 [bold cyan]6.[/bold cyan] 🚪  Exit
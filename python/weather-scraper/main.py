@@ -30,9 +30,12 @@ from utils import (
     select_city,
     save_data,
     generate_filename,
-    validate_date_format
+    validate_date_format,
+    parse_target_times
 )
-from config import DEFAULT_COUNTRY
+from cache import historic_cache
+from city_index import load_city_index
+from config import DEFAULT_COUNTRY, DEFAULT_TARGET_TIMES
 
 app = typer.Typer(help="🌦️ Comprehensive Weather CLI Application")
 console = Console()
@@ -80,7 +83,7 @@ def get_country_and_city():
     if choice == "1":
         display_city_list(cities)
     
-    current_city = select_city(cities)
+    current_city = select_city(cities, load_city_index(current_country, cities))
     display_success(f"Selected: {current_city.capitalize()}, {current_country.capitalize()}")
     
     return current_country, current_city
@@ -187,8 +190,21 @@ def handle_date_range_weather():
         else:
             display_error("Invalid date format. Please use YYYY-MM-DD")
     
+    # Get times of day to sample
+    while True:
+        times_input = Prompt.ask(
+            "Enter times of day (HH:MM, comma-separated, or 'hourly')",
+            default=",".join(DEFAULT_TARGET_TIMES)
+        )
+        
+        try:
+            target_times = parse_target_times(times_input)
+            break
+        except ValueError as e:
+            display_error(str(e))
+    
     display_loading(f"Fetching weather data from {start_date} to {end_date}...")
-    df = fetch_date_range_weather(country, city, start_date, end_date)
+    df = fetch_date_range_weather(country, city, start_date, end_date, target_times=target_times)
     
     if df is None or df.empty:
         display_error("No weather data available for the specified date range")
@@ -340,7 +356,7 @@ def today(
             display_error(f"No cities found for {current_country}")
             return
         display_city_list(cities)
-        current_city = select_city(cities)
+        current_city = select_city(cities, load_city_index(current_country, cities))
     else:
         current_city = city.lower()
     
@@ -375,7 +391,7 @@ def historic(
             display_error(f"No cities found for {current_country}")
             return
         display_city_list(cities)
-        current_city = select_city(cities)
+        current_city = select_city(cities, load_city_index(current_country, cities))
     else:
         current_city = city.lower()
     
@@ -405,7 +421,7 @@ def plot24(
             display_error(f"No cities found for {current_country}")
             return
         display_city_list(cities)
-        current_city = select_city(cities)
+        current_city = select_city(cities, load_city_index(current_country, cities))
     else:
         current_city = city.lower()
     
@@ -425,6 +441,21 @@ def interactive():
     interactive_menu()
 
 
+@app.command()
+def cache(
+    clear: bool = typer.Option(False, "--clear", help="Delete all cached historic data")
+):
+    """Show (or clear) the historic weather cache."""
+    if clear:
+        historic_cache.clear()
+        display_success("Historic weather cache cleared")
+    stats = historic_cache.stats()
+    display_info(
+        f"{stats['entries']} cached days, {stats['bytes'] / 1024 / 1024:.1f} of "
+        f"{stats['max_bytes'] / 1024 / 1024:.0f} MiB ({historic_cache.path})"
+    )
+
+
 @app.command()
 def version():
     """Show version information."""
@@ -3,17 +3,57 @@
 import os
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 from io import StringIO
+from lxml import html as lxml_html
 import pendulum
 from rich.console import Console
 from config import *
+from cache import historic_cache
 
 console = Console()
 
 
+class HostRateLimiter:
+    """Space out requests so each host sees at most `rate` requests per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until the next request slot for the url's host."""
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+
+
+def make_session(pool_size=FETCH_WORKERS):
+    """Create a session whose connection pool fits `pool_size` concurrent requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(REQUEST_HEADERS)
+    return session
+
+
 def get_cities(country="india", force_refresh=False):
     """Fetch and cache cities for a given country."""
     filename = os.path.join(DATA_DIR, CITIES_FILE_TEMPLATE.format(country))
@@ -79,113 +119,346 @@ def fetch_today_weather(country, city):
     return data
 
 
+WHITESPACE_RE = re.compile(r"[\r\n]+|\s{2,}")
+NA_VALUES = {"", "N/A", "NA", "n/a", "nan", "NaN", "-", "--", "null", "None"}
+
+# Patterns shared by the historic table cleanup
+NO_DATA_RE = re.compile("No data available", re.IGNORECASE)
+AD_RE = re.compile("CustomWeather", re.IGNORECASE)
+TEMPERATURE_RE = re.compile(r"(-?\d+)\s*°\s*C", re.IGNORECASE)
+TEMPERATURE_STRIP_RE = re.compile(r"-?\d+\s*°\s*C", re.IGNORECASE)
+TIME_RE = re.compile(r"(\d{1,2}[:.]\d{2})")
+READING_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*([^\d\s]\S*)?")
+CALM_RE = re.compile("No wind", re.IGNORECASE)
+
+# Imperial readings converted to the units in config
+UNIT_CONVERSIONS = {
+    "°F": lambda v: (v - 32) * 5 / 9,
+    "mph": lambda v: v * 1.609344,
+    '"Hg': lambda v: v * 33.8639,
+    "mi": lambda v: v * 1.609344,
+}
+READING_COLUMNS = ["Temperature", "Wind", "Humidity", "Barometer", "Visibility"]
+HISTORIC_DTYPES = {
+    "Temperature": "float32",
+    "Weather": "category",
+    "Wind": "float32",
+    "Humidity": "float32",
+    "Barometer": "float32",
+    "Visibility": "float32",
+}
+
+HISTORIC_COLUMNS = {
+    "Unnamed: 0_level_0_Time": "Time",
+    "Time": "Time",
+    "Conditions_Temp": "Temperature",
+    "Conditions_Weather": "Weather",
+    "Conditions_Wind": "Wind",
+    "Conditions": "Weather",
+    "Comfort_Humidity": "Humidity",
+    "Comfort_Barometer": "Barometer",
+    "Comfort_Visibility": "Visibility",
+}
+WANTED_COLUMNS = ["Time", "Temperature", "Weather", "Wind", "Humidity", "Barometer", "Visibility"]
+
+
+def _contains(df: pd.DataFrame, pattern) -> np.ndarray:
+    """Per-row mask of rows where any text cell matches the pattern.
+
+    All text cells are matched in one vectorised call over the flattened
+    values rather than per row or per column.
+    """
+    text = df.select_dtypes(include=["object", "string"])
+    if text.shape[1] == 0:
+        return np.zeros(len(df), dtype=bool)
+    cells = pd.Series(text.to_numpy(dtype=object).ravel(), dtype=object)
+    return cells.str.contains(pattern, na=False).to_numpy(dtype=bool).reshape(text.shape).any(axis=1)
+
+
 def _looks_like_no_data(df: pd.DataFrame) -> bool:
     """Check if DataFrame contains 'no data' indicators."""
     if df is None or df.empty:
         return True
-    txt = df.astype(str)
-    return txt.apply(lambda s: s.str.contains("No data available", case=False)).any().any()
+    return bool(_contains(df, NO_DATA_RE).any())
+
+
+def _flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Join MultiIndex header levels into single column names."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [
+            "_".join([str(c) for c in col if c and str(c) != "nan"]).strip("_")
+            for col in df.columns
+        ]
+    else:
+        df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def _read_table_lxml(page: str) -> pd.DataFrame | None:
+    """Extract the historic table in a single lxml pass.
+
+    Builds the same flattened columns as the read_html path (including its
+    "Unnamed: i_level_j" names for blank headers). Returns None when the page
+    layout isn't recognised, so the caller can fall back to read_html.
+    """
+    try:
+        doc = lxml_html.fromstring(page)
+    except (ValueError, lxml_html.etree.ParserError):
+        return None
+    tables = doc.xpath('//table[@id="wt-his"]') or doc.xpath('//table[@class="zebra tb-wt fw va-m tb-hover"]')
+    if not tables:
+        return None
+    table = tables[0]
+    for br in table.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+
+    def text(cell):
+        return WHITESPACE_RE.sub(" ", cell.text_content().strip())
+
+    def span(cell, name):
+        value = cell.get(name, "1").strip()
+        return int(value) if value.isdecimal() and int(value) > 0 else None
+
+    # Expand colspan/rowspan of the header rows into a grid of names
+    header_rows = table.xpath("./thead/tr")
+    if not header_rows:
+        return None
+    grid = [[] for _ in header_rows]
+    for i, tr in enumerate(header_rows):
+        j = 0
+        for cell in tr.xpath("./th|./td"):
+            while j < len(grid[i]) and grid[i][j] is not None:
+                j += 1
+            colspan, rowspan = span(cell, "colspan"), span(cell, "rowspan")
+            if colspan is None or rowspan is None:
+                return None  # malformed span; leave it to read_html
+            for di in range(min(rowspan, len(grid) - i)):
+                row = grid[i + di]
+                row.extend([None] * (j + colspan - len(row)))
+                for dj in range(colspan):
+                    row[j + dj] = text(cell)
+            j += colspan
+    width = len(grid[0])
+    if width == 0 or any(len(row) != width or None in row for row in grid):
+        return None
+    columns = [
+        "_".join(name or f"Unnamed: {j}_level_{i}" for i, name in enumerate(names))
+        for j, names in enumerate(zip(*grid))
+    ]
+    if len(grid) == 1:
+        columns = [name or f"Unnamed: {j}" for j, name in enumerate(grid[0])]
+
+    rows = []
+    for tr in table.xpath("./tbody/tr"):
+        cells = [text(cell) for cell in tr.xpath("./th|./td")]
+        if len(cells) != width:
+            return None
+        rows.append([None if value in NA_VALUES else value for value in cells])
+    if not rows:
+        return None
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _read_table_bs4(page: str) -> pd.DataFrame | None:
+    """Extract the historic table with BeautifulSoup and pd.read_html."""
+    soup = BeautifulSoup(page, "html.parser")
+    table = soup.find("table", id="wt-his") or soup.find("table", {"class": "zebra tb-wt fw va-m tb-hover"})
+    
+    if not table:
+        return None
+
+    try:
+        raw = pd.read_html(StringIO(str(table)))
+    except ValueError:
+        return None
+        
+    if not raw:
+        return None
+
+    return _flatten_columns(raw[0].copy())
 
 
-def fetch_historic_weather(country: str, city: str, date_str: str) -> pd.DataFrame | None:
-    """Fetch historic weather data for a specific date."""
+def _read_historic_table(page: str) -> pd.DataFrame | None:
+    """Extract the historic table, falling back to read_html for unknown layouts."""
+    df = _read_table_lxml(page)
+    if df is None:
+        df = _read_table_bs4(page)
+    return df
+
+
+def _apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Restore the typed historic columns, e.g. after concatenating days."""
+    return df.astype({c: dtype for c, dtype in HISTORIC_DTYPES.items() if c in df.columns})
+
+
+def _clean_historic_frame(df: pd.DataFrame, date_str: str | None = None) -> pd.DataFrame:
+    """Turn a raw historic table into the Time/Temperature/Weather/... frame.
+
+    Works column by column: drops the ad rows, splits a combined
+    "Conditions" column into Temperature and Weather, normalises the
+    observation times (sorted, with Time_clean and Time_parsed helpers) and
+    parses the readings into float32 columns in the units from config, with
+    Weather as a category. Given the day's `date_str`, a Timestamp column
+    is added too.
+    """
+    columns = [HISTORIC_COLUMNS.get(c, c) for c in df.columns]
+
+    # Fix Time column
+    if "Time" not in columns:
+        time_like = [i for i, c in enumerate(columns) if "Time" in c]
+        if time_like:
+            columns[time_like[0]] = "Time"
+    df = df.set_axis(columns, axis=1)
+
+    # Remove ads/promotional content
+    keep = ~_contains(df, AD_RE)
+
+    # Extract temperature from weather column if needed
+    if ("Temperature" not in df.columns) and ("Weather" in df.columns):
+        df = df.assign(
+            Temperature=df["Weather"].str.extract(TEMPERATURE_RE, expand=False),
+            Weather=df["Weather"].str.replace(TEMPERATURE_STRIP_RE, "", regex=True).str.strip(" ."),
+        )
+
+    # Keep only wanted columns
+    df = df[[c for c in WANTED_COLUMNS if c in df.columns]]
+
+    if "Time" not in df.columns:
+        return _type_readings(df[keep].reset_index(drop=True))
+
+    # Clean and parse time, then select the kept rows in time order at once
+    time_clean = df["Time"].astype(str).str.extract(TIME_RE, expand=False).str.replace(".", ":", regex=False)
+    parsed = pd.to_datetime(time_clean, format="%H:%M", errors="coerce")
+    keep &= parsed.notna().to_numpy()
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(parsed.to_numpy()[rows], kind="stable")]
+    df = df.iloc[rows].reset_index(drop=True)
+    time_clean = time_clean.iloc[rows].reset_index(drop=True)
+    df["Time"] = time_clean.str.zfill(5)
+    df["Time_clean"] = time_clean
+    df["Time_parsed"] = parsed.iloc[rows].dt.time.to_numpy()
+    if date_str is not None:
+        df["Timestamp"] = pd.Timestamp(date_str) + (parsed.iloc[rows] - pd.Timestamp("1900-01-01")).to_numpy()
+    return _type_readings(df)
+
+
+def _type_readings(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse readings like "19 °C", "8 km/h" or "62%" into float32 columns in the configured units.
+
+    All reading cells are parsed in one pass over the flattened values.
+    """
+    columns = [c for c in READING_COLUMNS if c in df.columns]
+    if columns and not df.empty:
+        cells = pd.Series(df[columns].to_numpy(dtype=object).ravel(), dtype=object).astype(str)
+        parts = cells.str.extract(READING_RE)
+        numbers = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype="float64", copy=True)
+        units = parts[1].to_numpy(dtype=object)
+        for unit, convert in UNIT_CONVERSIONS.items():
+            imperial = units == unit
+            if imperial.any():
+                numbers[imperial] = convert(numbers[imperial])
+        numbers[cells.str.contains(CALM_RE).to_numpy(dtype=bool)] = 0
+        numbers = numbers.reshape(len(df), len(columns)).astype("float32")
+        for i, column in enumerate(columns):
+            df[column] = numbers[:, i]
+    return _apply_dtypes(df)
+
+
+def fetch_historic_weather(country: str, city: str, date_str: str, session=None, cache=historic_cache) -> pd.DataFrame | None:
+    """Fetch historic weather data for a specific date.
+
+    Pass a shared `session` to reuse connections across calls; requests are
+    rate limited per host either way. Days are served from `cache` when
+    possible (pass cache=None to always scrape).
+    """
+    if cache is not None:
+        cached = cache.get(country, city, date_str)
+        if cached is not None:
+            return cached
+
     urls = [
-        f"https://www.timeanddate.com/weather/{country}/{city}/historic?hd={date_str}",
-        f"https://www.timeanddate.com/weather/{country}/{city}/historic?start={date_str}",
+        f"{BASE_URL}/{country}/{city}/historic?hd={date_str}",
+        f"{BASE_URL}/{country}/{city}/historic?start={date_str}",
     ]
     
     for url in urls:
         console.print(f"[cyan]Fetching:[/] {url}")
         
         try:
-            response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
+            rate_limiter.wait(url)
+            if session is None:
+                response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
+            else:
+                response = session.get(url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
         except requests.RequestException as e:
             console.print(f"❌ Network error: {e}", style="bold red")
             continue
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table", id="wt-his") or soup.find("table", {"class": "zebra tb-wt fw va-m tb-hover"})
-        
-        if not table:
-            continue
-
-        try:
-            raw = pd.read_html(StringIO(str(table)))
-        except ValueError:
-            continue
-            
-        if not raw:
-            continue
-
-        df = raw[0].copy()
+        df = _read_historic_table(response.text)
 
         if _looks_like_no_data(df):
             continue
 
-        # Handle MultiIndex columns
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [
-                "_".join([str(c) for c in col if c and str(c) != "nan"]).strip("_")
-                for col in df.columns
-            ]
-        else:
-            df.columns = [str(c) for c in df.columns]
-
-        # Rename columns
-        rename_map = {
-            "Unnamed: 0_level_0_Time": "Time",
-            "Time": "Time",
-            "Conditions_Temp": "Temperature",
-            "Conditions_Weather": "Weather",
-            "Conditions_Wind": "Wind",
-            "Conditions": "Weather",
-            "Comfort_Humidity": "Humidity",
-            "Comfort_Barometer": "Barometer",
-            "Comfort_Visibility": "Visibility",
-        }
-        df.rename(columns=rename_map, inplace=True)
-
-        # Fix Time column
-        if "Time" not in df.columns:
-            time_like = [c for c in df.columns if "Time" in c]
-            if time_like:
-                df.rename(columns={time_like[0]: "Time"}, inplace=True)
-
-        # Remove ads/promotional content
-        df = df[~df.apply(lambda row: row.astype(str).str.contains("CustomWeather", case=False).any(), axis=1)]
-
-        # Extract temperature from weather column if needed
-        if ("Temperature" not in df.columns) and ("Weather" in df.columns):
-            df["Temperature"] = df["Weather"].str.extract(r"(-?\d+)\s*°\s*C", flags=re.IGNORECASE)[0]
-            df["Weather"] = (
-                df["Weather"]
-                .str.replace(r"-?\d+\s*°\s*C", "", regex=True, flags=re.IGNORECASE)
-                .str.strip(" .")
-            )
-
-        # Keep only wanted columns
-        wanted = ["Time", "Temperature", "Weather", "Wind", "Humidity", "Barometer", "Visibility"]
-        df = df[[c for c in wanted if c in df.columns]]
-
-        # Clean and parse time
-        if "Time" in df.columns:
-            df["Time_clean"] = df["Time"].astype(str).str.extract(r"(\d{1,2}[:.]\d{2})")[0]
-            df["Time_clean"] = df["Time_clean"].str.replace(".", ":", regex=False)
-            df["Time_parsed"] = pd.to_datetime(df["Time_clean"], format="%H:%M", errors="coerce").dt.time
-            df = df.dropna(subset=["Time_parsed"])
-            df["Time"] = df["Time_parsed"].astype(str).str[:5]
-            df = df.sort_values("Time_parsed").reset_index(drop=True)
+        df = _clean_historic_frame(df, date_str)
 
         if not df.empty and ("Temperature" in df.columns or "Weather" in df.columns):
+            if cache is not None:
+                cache.put(country, city, date_str, df)
             return df
 
     console.print("❌ No historic data available for that date.", style="bold red")
     return None
 
 
-def fetch_date_range_weather(country: str, city: str, start_date: str, end_date: str):
-    """Fetch weather data for a date range at specific times (6am, 12pm, 6pm, 12am)."""
+def _minute_of_day(times: pd.Series) -> pd.Series:
+    """Minutes since midnight of "HH:MM" strings."""
+    return times.str[:2].astype("int64") * 60 + times.str[3:5].astype("int64")
+
+
+def sample_nearest_times(days, target_times=DEFAULT_TARGET_TIMES) -> pd.DataFrame | None:
+    """Pick each day's observation nearest to every target time.
+
+    `days` is a list of (date "YYYY-MM-DD", DataFrame) pairs. All days are
+    concatenated once and matched with a single as-of join by Date; a target
+    halfway between two observations gets the earlier one. Rows come out in day order, then target order.
+    """
+    days = [(date, df) for date, df in days if df is not None and not df.empty]
+    if not days:
+        return None
+
+    observations = pd.concat([df.assign(Date=date) for date, df in days], ignore_index=True)
+    observations["_minute"] = _minute_of_day(observations["Time"])
+    # of observations sharing a time, the first one listed is used
+    observations = observations.sort_values("_minute", kind="stable").drop_duplicates(["Date", "_minute"])
+
+    targets = pd.DataFrame({
+        "Date": [date for date, _ in days for _ in target_times],
+        "Target_Time": [target for _ in days for target in target_times],
+    })
+    targets["_order"] = range(len(targets))
+    targets["_minute"] = _minute_of_day(targets["Target_Time"])
+    targets = targets.sort_values("_minute", kind="stable")
+
+    result = pd.merge_asof(targets, observations, on="_minute", by="Date", direction="nearest")
+    result = result.sort_values("_order").drop(columns=["_order", "_minute"]).reset_index(drop=True)
+
+    # Reorder columns
+    cols = ["Date", "Target_Time", "Time"] + [c for c in result.columns if c not in ["Date", "Target_Time", "Time"]]
+    result = _apply_dtypes(result[[c for c in cols if c in result.columns]])
+    if "Weather" in result.columns:
+        result["Weather"] = result["Weather"].cat.remove_unused_categories()
+    return result
+
+
+def fetch_date_range_weather(country: str, city: str, start_date: str, end_date: str,
+                             max_workers=FETCH_WORKERS, target_times=DEFAULT_TARGET_TIMES):
+    """Fetch weather data for a date range at specific times (by default 6am, 12pm, 6pm, 12am).
+
+    Days are fetched concurrently by up to `max_workers` threads sharing one
+    session; each day's observation nearest to every time in `target_times`
+    ("HH:MM" strings) is returned, in date order.
+    """
     start = pendulum.parse(start_date)
     end = pendulum.parse(end_date)
     
@@ -193,38 +466,25 @@ def fetch_date_range_weather(country: str, city: str, start_date: str, end_date:
         console.print("❌ Start date cannot be after end date.", style="bold red")
         return None
     
-    all_data = []
+    dates = []
     current_date = start
+    while current_date <= end:
+        dates.append(current_date)
+        current_date = current_date.add(days=1)
     
     console.print(f"[cyan]Fetching weather data from {start_date} to {end_date}...[/]")
     
-    while current_date <= end:
-        date_str = current_date.format("YYYYMMDD")
-        console.print(f"[yellow]Processing {current_date.format('YYYY-MM-DD')}...[/]")
+    with make_session(max_workers) as session:
+        def fetch_day(date):
+            console.print(f"[yellow]Processing {date.format('YYYY-MM-DD')}...[/]")
+            return fetch_historic_weather(country, city, date.format("YYYYMMDD"), session=session)
         
-        df = fetch_historic_weather(country, city, date_str)
-        if df is not None and not df.empty:
-            # Filter for specific times: 6am, 12pm, 6pm, 12am
-            target_times = ["06:00", "12:00", "18:00", "00:00"]
-            for target_time in target_times:
-                closest_row = df.iloc[(pd.to_datetime(df["Time"], format="%H:%M", errors="coerce") - 
-                                     pd.to_datetime(target_time, format="%H:%M")).abs().argsort()[:1]]
-                if not closest_row.empty:
-                    row_data = closest_row.iloc[0].copy()
-                    row_data["Date"] = current_date.format("YYYY-MM-DD")
-                    row_data["Target_Time"] = target_time
-                    all_data.append(row_data)
-        
-        current_date = current_date.add(days=1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(fetch_day, dates))
     
-    if all_data:
-        result_df = pd.DataFrame(all_data)
-        # Reorder columns
-        cols = ["Date", "Target_Time", "Time"] + [c for c in result_df.columns if c not in ["Date", "Target_Time", "Time"]]
-        result_df = result_df[[c for c in cols if c in result_df.columns]]
-        return result_df
-    
-    return None
+    return sample_nearest_times(
+        [(date.format("YYYY-MM-DD"), df) for date, df in zip(dates, frames)], target_times
+    )
 
 
 def fetch_last_24hrs_weather(country: str, city: str):
@@ -243,22 +503,16 @@ def fetch_last_24hrs_weather(country: str, city: str):
             all_data.append(df)
     
     if all_data:
-        combined_df = pd.concat(all_data, ignore_index=True)
+        combined_df = _apply_dtypes(pd.concat(all_data, ignore_index=True))
         
         # Sort by date and time
-        combined_df["DateTime"] = pd.to_datetime(
-            combined_df["Date"] + " " + combined_df["Time"], 
-            format="%Y-%m-%d %H:%M", 
-            errors="coerce"
-        )
-        combined_df = combined_df.dropna(subset=["DateTime"])
-        combined_df = combined_df.sort_values("DateTime")
+        combined_df = combined_df.sort_values("Timestamp")
         
         # Filter last 24 hours
         now = pendulum.now()
         twenty_four_hours_ago = now.subtract(hours=24)
         
-        mask = combined_df["DateTime"] >= twenty_four_hours_ago.to_datetime_string()
+        mask = combined_df["Timestamp"] >= twenty_four_hours_ago.to_datetime_string()
         return combined_df[mask].reset_index(drop=True)
     
     return None
\ No newline at end of file
@@ -6,41 +6,45 @@ import numpy as np
 import pendulum
 import re
 from rich.console import Console
-from config import DATA_DIR
+from config import DATA_DIR, CITY_SEARCH_LIMIT
+from city_index import CityIndex
 import os
 
 console = Console()
 
 
-def search_cities(cities, query):
-    """Search for cities matching the query."""
-    query = query.lower()
-    return [c for c in cities if query in c.lower()]
+def search_cities(cities, query, index=None):
+    """Search for cities matching the query, best matches first (typos are tolerated)."""
+    if index is None:
+        index = CityIndex(cities)
+    return index.search(query, limit=None)
 
 
-def select_city(cities):
-    """Interactive city selection."""
+def select_city(cities, index=None):
+    """Interactive city selection; pass the country's CityIndex to search it directly."""
     while True:
         from rich.prompt import Prompt
         selection = Prompt.ask("\nEnter city name or number from the list").strip()
         
         if selection.isdigit():
-            index = int(selection)
-            if 1 <= index <= len(cities):
-                return cities[index - 1]
+            choice = int(selection)
+            if 1 <= choice <= len(cities):
+                return cities[choice - 1]
             else:
                 console.print("❌ Invalid number selection.", style="bold red")
         else:
-            matches = search_cities(cities, selection)
+            matches = search_cities(cities, selection, index)
             if not matches:
                 console.print("❌ No matching cities found. Try again.", style="bold red")
             elif len(matches) == 1:
                 return matches[0]
             else:
                 console.print("\nMatching Cities:")
-                for i, c in enumerate(matches, 1):
+                for i, c in enumerate(matches[:CITY_SEARCH_LIMIT], 1):
                     console.print(f"{i}. {c.capitalize()}")
-                cities = matches
+                if len(matches) > CITY_SEARCH_LIMIT:
+                    console.print(f"... and {len(matches) - CITY_SEARCH_LIMIT} more, type more of the name to narrow down")
+                cities, index = matches, None
 
 
 def filter_by_time_range(df: pd.DataFrame, start_hm: str, end_hm: str) -> pd.DataFrame:
@@ -89,6 +93,14 @@ def extract_numeric_humidity(humidity_str):
     return np.nan
 
 
+def numeric_column(df: pd.DataFrame, column, extract):
+    """Numeric values of a column, parsing text cells with `extract` when it isn't typed yet."""
+    values = df[column]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.dropna()
+    return values.apply(extract).dropna()
+
+
 def save_data(filename, data, file_format="json"):
     """Save data to file in specified format."""
     filepath = os.path.join(DATA_DIR, filename)
@@ -104,7 +116,7 @@ def save_data(filename, data, file_format="json"):
                 with open(filepath, "w") as f:
                     json.dump(data, f, indent=4)
             else:
-                data.to_json(filepath, orient="records", force_ascii=False, indent=4)
+                data.to_json(filepath, orient="records", force_ascii=False, indent=4, date_format="iso")
 
         console.print(f"✅ Saved as [bold green]{filepath}[/bold green]")
         return True
@@ -142,12 +154,32 @@ def validate_date_format(date_str):
         return None
 
 
+def parse_target_times(spec):
+    """Parse target times ("06:00,18:30", "6.00 18:30" or "hourly") into a list of HH:MM strings."""
+    if spec.strip().lower() == "hourly":
+        return [f"{hour:02d}:00" for hour in range(24)]
+
+    times = []
+    for part in re.split(r"[,\s]+", spec.strip()):
+        if not part:
+            continue
+        match = re.fullmatch(r"(\d{1,2})[:.](\d{2})", part)
+        if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"Invalid target time: {part!r} (use HH:MM)")
+        time_str = f"{int(match.group(1)):02d}:{match.group(2)}"
+        if time_str not in times:
+            times.append(time_str)
+    if not times:
+        raise ValueError("No target times given")
+    return times
+
+
 def calculate_statistics(df: pd.DataFrame):
     """Calculate weather statistics from DataFrame."""
     stats = {}
     
     if "Temperature" in df.columns:
-        temps = df["Temperature"].apply(extract_numeric_temperature).dropna()
+        temps = numeric_column(df, "Temperature", extract_numeric_temperature)
         if not temps.empty:
             stats["temperature"] = {
                 "avg": float(temps.mean()),
@@ -157,7 +189,7 @@ def calculate_statistics(df: pd.DataFrame):
             }
     
     if "Humidity" in df.columns:
-        humidity = df["Humidity"].apply(extract_numeric_humidity).dropna()
+        humidity = numeric_column(df, "Humidity", extract_numeric_humidity)
         if not humidity.empty:
             stats["humidity"] = {
                 "avg": float(humidity.mean()),
@@ -169,9 +201,11 @@ def calculate_statistics(df: pd.DataFrame):
     if "Weather" in df.columns:
         weather_modes = df["Weather"].dropna()
         if not weather_modes.empty:
+            counts = weather_modes.value_counts()
             stats["weather"] = {
                 "most_common": weather_modes.mode().iloc[0] if not weather_modes.mode().empty else "N/A",
-                "conditions": weather_modes.value_counts().to_dict()
+                # categorical columns also count conditions absent from this data
+                "conditions": counts[counts > 0].to_dict()
             }
     
     return stats
\ No newline at end of file